@@ -0,0 +1,151 @@
+"""On-disk cache for static page assets, shared by every browser on one machine."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+import hashlib
+import json
+import os
+import time
+
+# 只缓存静态资源；文章 HTML 本身每次都从站点获取
+CACHEABLE_TYPES = frozenset({"stylesheet", "script", "font", "image"})
+DEFAULT_MAX_AGE_S = 7 * 24 * 3600
+# route.fetch() 返回的是解码后的正文，这些头不能原样回放
+_DROPPED_HEADERS = frozenset(
+    {"content-encoding", "content-length", "transfer-encoding", "set-cookie", "connection"}
+)
+
+
+def cache_root() -> Path:
+    """Per-user cache directory of this tool (``$XDG_CACHE_HOME/kexue_book``)."""
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "kexue_book"
+
+
+def default_cache_dir() -> Path:
+    return cache_root() / "assets"
+
+
+@dataclass
+class AssetCacheStats:
+    hits: int = 0
+    misses: int = 0
+    bytes_saved: int = 0
+    bytes_fetched: int = 0
+
+    def add(self, other: "AssetCacheStats") -> None:
+        self.hits += other.hits
+        self.misses += other.misses
+        self.bytes_saved += other.bytes_saved
+        self.bytes_fetched += other.bytes_fetched
+
+    @property
+    def hit_ratio(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"命中 {self.hits}/{self.hits + self.misses} ({self.hit_ratio:.0%})，"
+            f"节省 {self.bytes_saved / (1024 * 1024):.1f} MB，"
+            f"下载 {self.bytes_fetched / (1024 * 1024):.1f} MB"
+        )
+
+
+class AssetCache:
+    """
+    Serve stylesheets, scripts, fonts and images from ``root`` through ``context.route``.
+
+    Entries are one body file plus a JSON metadata file, keyed by the SHA-256 of
+    the URL and written with an atomic rename, so any number of worker processes
+    (and later runs) can share the directory without locking. Responses marked
+    ``no-store``/``private`` and non-200 responses are passed through uncached;
+    entries older than ``max_age_s`` are fetched again.
+    """
+
+    def __init__(self, root: Path, max_age_s: float = DEFAULT_MAX_AGE_S) -> None:
+        self.root = root
+        self.max_age_s = max_age_s
+        self.stats = AssetCacheStats()
+        root.mkdir(parents=True, exist_ok=True)
+
+    def attach(self, context) -> None:
+        context.route("**/*", self._handle)
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        folder = self.root / key[:2]
+        return folder / f"{key}.body", folder / f"{key}.json"
+
+    def _load(self, url: str) -> tuple[dict[str, Any], bytes] | None:
+        body_path, meta_path = self._paths(url)
+        try:
+            with meta_path.open("r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if time.time() - float(meta["stored_at"]) > self.max_age_s:
+                return None
+            body = body_path.read_bytes()
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if len(body) != meta.get("size"):
+            return None
+        return meta, body
+
+    def _store(self, url: str, status: int, headers: dict[str, str], body: bytes) -> None:
+        body_path, meta_path = self._paths(url)
+        body_path.parent.mkdir(parents=True, exist_ok=True)
+        meta = {
+            "url": url,
+            "status": status,
+            "headers": {
+                name: value
+                for name, value in headers.items()
+                if name.lower() not in _DROPPED_HEADERS
+            },
+            "size": len(body),
+            "stored_at": time.time(),
+        }
+        # 先写正文再写元数据：元数据存在即代表条目完整
+        for path, data in (
+            (body_path, body),
+            (meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8")),
+        ):
+            tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            try:
+                tmp_path.write_bytes(data)
+                os.replace(tmp_path, path)
+            finally:
+                tmp_path.unlink(missing_ok=True)
+
+    def _handle(self, route, request) -> None:
+        if request.method != "GET" or request.resource_type not in CACHEABLE_TYPES:
+            route.continue_()
+            return
+
+        url = request.url
+        cached = self._load(url)
+        if cached is not None:
+            meta, body = cached
+            self.stats.hits += 1
+            self.stats.bytes_saved += len(body)
+            route.fulfill(status=meta["status"], headers=meta["headers"], body=body)
+            return
+
+        try:
+            response = route.fetch()
+            body = response.body()
+        except Exception:
+            route.continue_()
+            return
+        self.stats.misses += 1
+        self.stats.bytes_fetched += len(body)
+        cache_control = response.headers.get("cache-control", "").lower()
+        if response.status == 200 and "no-store" not in cache_control and "private" not in cache_control:
+            try:
+                self._store(url, response.status, response.headers, body)
+            except OSError as exc:
+                print(f"[cache] warn 资源缓存写入失败: {url} ({exc})")
+        route.fulfill(response=response, body=body)
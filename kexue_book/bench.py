@@ -0,0 +1,396 @@
+from __future__ import annotations
+
+from argparse import ArgumentParser
+from datetime import date, datetime, timezone
+from pathlib import Path
+from threading import Event, Thread
+from typing import Any, Callable
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from .fixture_site import FixtureConfig, FixtureSite
+from .memory import tree_rss
+from .types import Post
+
+# 2: peak_rss_mb is the process-tree total; the old value is largest_process_rss_mb
+RESULT_SCHEMA_VERSION = 2
+MERGE_PAGES_PER_CHAPTER = 10
+RSS_SAMPLE_SECONDS = 0.1
+
+
+class _TreeRssSampler:
+    """Sample the RSS of this process and all its children; keeps the largest total."""
+
+    def __init__(self) -> None:
+        self.peak: int | None = None
+        self._stop = Event()
+        self._thread = Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while True:
+            total = tree_rss(os.getpid())
+            if total is not None:
+                self.peak = max(self.peak or 0, total)
+            if self._stop.wait(RSS_SAMPLE_SECONDS):
+                return
+
+    def __enter__(self) -> "_TreeRssSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def peak_mb(self) -> float | None:
+        return None if self.peak is None else round(self.peak / (1024 * 1024), 1)
+
+
+def _largest_process_rss_mb() -> float | None:
+    # 单个进程（本进程或某个已结束的子进程）的峰值，不是整个进程树的总和
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - Windows
+        return None
+
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux.
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+def _case_crawl(category_url: str, start: str, end: str) -> int:
+    from .crawl import crawl_posts
+
+    posts = crawl_posts(
+        date.fromisoformat(start), date.fromisoformat(end), base_url=category_url
+    )
+    return len(posts)
+
+
+def _case_render(posts: list[Post], out_dir: str, workers: int, delay_ms: int) -> int:
+    from .render import RenderOptions, render_posts_to_pdfs
+
+    output = render_posts_to_pdfs(
+        posts, Path(out_dir) / "chapters", RenderOptions(delay_ms=delay_ms), workers=workers
+    )
+    # 有文章渲染失败时耗时不可比，记为失败而不是一次更快的结果
+    if len(output.pdf_paths) < len(posts):
+        raise RuntimeError(f"只渲染成功 {len(output.pdf_paths)}/{len(posts)} 篇")
+    return len(output.pdf_paths)
+
+
+def _case_merge(chapters: list[str], out_path: str) -> int:
+    from .merge import merge_pdfs
+
+    posts = [
+        Post(title=f"Chapter {i}", url=f"https://example.invalid/{i}", date=date(2015, 1, 1))
+        for i in range(len(chapters))
+    ]
+    merge_pdfs(
+        [Path(path) for path in chapters],
+        posts,
+        Path(out_path),
+        add_cover=True,
+        add_page_numbers=True,
+    )
+    return len(chapters) * MERGE_PAGES_PER_CHAPTER
+
+
+def _run_in_child(fn: Callable[..., int], kwargs: dict[str, Any], conn) -> None:
+    try:
+        with _TreeRssSampler() as sampler:
+            started = time.perf_counter()
+            items = fn(**kwargs)
+            elapsed = time.perf_counter() - started
+        conn.send(
+            {
+                "items": items,
+                "wall_seconds": elapsed,
+                "peak_rss_mb": sampler.peak_mb(),
+                "largest_process_rss_mb": _largest_process_rss_mb(),
+            }
+        )
+    except BaseException as exc:  # report any failure to the parent
+        conn.send({"error": f"{exc.__class__.__name__}: {exc}"})
+    finally:
+        conn.close()
+
+
+def _measure(name: str, unit: str, fn: Callable[..., int], **kwargs: Any) -> dict[str, Any]:
+    """Run one case in a fresh process so peak RSS is not polluted by earlier cases."""
+    ctx = multiprocessing.get_context("spawn")
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_run_in_child, args=(fn, kwargs, child_conn))
+    process.start()
+    child_conn.close()
+    try:
+        result = parent_conn.recv()
+    except EOFError:
+        result = {"error": f"case process exited with code {process.exitcode}"}
+    process.join()
+
+    entry: dict[str, Any] = {"name": name, "unit": unit}
+    if "error" in result:
+        entry["error"] = result["error"]
+        print(f"[bench] {name}: 失败 ({result['error']})")
+        return entry
+
+    wall = result["wall_seconds"]
+    entry.update(
+        items=result["items"],
+        wall_seconds=round(wall, 3),
+        throughput=round(result["items"] / wall, 3) if wall > 0 else None,
+        peak_rss_mb=result["peak_rss_mb"],
+        largest_process_rss_mb=result["largest_process_rss_mb"],
+    )
+    print(
+        f"[bench] {name}: {entry['wall_seconds']}s, "
+        f"{entry['throughput']} {unit}/s, peak RSS {entry['peak_rss_mb']} MB "
+        f"(largest process {entry['largest_process_rss_mb']} MB)"
+    )
+    return entry
+
+
+def _make_synthetic_chapters(total_pages: int, chapters_dir: Path) -> list[str]:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    chapters_dir.mkdir(parents=True, exist_ok=True)
+    width, height = A4
+    paths: list[str] = []
+    for i in range(max(1, total_pages // MERGE_PAGES_PER_CHAPTER)):
+        path = chapters_dir / f"{i + 1:05d}-synthetic.pdf"
+        c = canvas.Canvas(str(path), pagesize=A4)
+        for page in range(MERGE_PAGES_PER_CHAPTER):
+            c.setFont("Helvetica", 11)
+            for line in range(40):
+                c.drawString(
+                    60, height - 60 - line * 16, f"chapter {i} page {page} line {line} " * 3
+                )
+            c.showPage()
+        c.save()
+        paths.append(str(path))
+    return paths
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).resolve().parent,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def _parse_int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def run_benchmarks(args) -> dict[str, Any]:
+    config = FixtureConfig(
+        posts=args.posts,
+        per_page=args.per_page,
+        images_per_post=args.images_per_post,
+        image_kb=args.image_kb,
+        typeset_ms=args.typeset_ms,
+    )
+    results: list[dict[str, Any]] = []
+
+    with tempfile.TemporaryDirectory(prefix="kexue-bench-") as tmp, FixtureSite(config) as site:
+        tmp_dir = Path(tmp)
+        start = config.first_date.isoformat()
+        end = site.post_date(config.posts).isoformat()
+        print(f"[bench] fixture site: {site.category_url} ({config.posts} posts)")
+
+        results.append(
+            _measure(
+                "crawl",
+                "posts",
+                _case_crawl,
+                category_url=site.category_url,
+                start=start,
+                end=end,
+            )
+        )
+
+        if not args.skip_render:
+            from .crawl import crawl_posts
+
+            # 文章列表只抓取一次，渲染用例只计时渲染本身
+            posts = crawl_posts(
+                date.fromisoformat(start), date.fromisoformat(end), base_url=site.category_url
+            )
+            for workers in _parse_int_list(args.workers):
+                results.append(
+                    _measure(
+                        f"render[workers={workers}]",
+                        "posts",
+                        _case_render,
+                        posts=posts,
+                        out_dir=str(tmp_dir / f"render-w{workers}"),
+                        workers=workers,
+                        delay_ms=args.delay_ms,
+                    )
+                )
+
+        for pages in _parse_int_list(args.merge_pages):
+            chapters = _make_synthetic_chapters(pages, tmp_dir / f"merge-{pages}")
+            results.append(
+                _measure(
+                    f"merge[pages={pages}]",
+                    "pages",
+                    _case_merge,
+                    chapters=chapters,
+                    out_path=str(tmp_dir / f"merge-{pages}.pdf"),
+                )
+            )
+
+    return {
+        "schema_version": RESULT_SCHEMA_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": multiprocessing.cpu_count(),
+        "config": {
+            "posts": config.posts,
+            "per_page": config.per_page,
+            "images_per_post": config.images_per_post,
+            "image_kb": config.image_kb,
+            "typeset_ms": config.typeset_ms,
+            "delay_ms": args.delay_ms,
+        },
+        "results": results,
+    }
+
+
+def compare_results(baseline_path: Path, candidate_path: Path) -> None:
+    """Print a per-case comparison of two result files (candidate vs baseline)."""
+    with baseline_path.open("r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    with candidate_path.open("r", encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    base_by_name = {entry["name"]: entry for entry in baseline.get("results", [])}
+    if baseline.get("schema_version") != candidate.get("schema_version"):
+        # 版本 1 的 peak_rss_mb 是单个进程的峰值，与进程树总和不可比
+        print("[bench] warn 两份结果的 schema_version 不同，峰值内存口径可能不一致")
+    print(
+        f"[bench] baseline {baseline.get('git_commit') or baseline_path} "
+        f"vs candidate {candidate.get('git_commit') or candidate_path}"
+    )
+    print(f"{'case':<24}{'wall(s)':>20}{'speedup':>10}{'peak RSS(MB)':>22}")
+    for entry in candidate.get("results", []):
+        old = base_by_name.get(entry["name"])
+        if old is None or "error" in old or "error" in entry:
+            print(f"{entry['name']:<24}{'n/a':>20}")
+            continue
+        speedup = old["wall_seconds"] / entry["wall_seconds"] if entry["wall_seconds"] else 0.0
+        wall = f"{old['wall_seconds']} -> {entry['wall_seconds']}"
+        rss = f"{old['peak_rss_mb']} -> {entry['peak_rss_mb']}"
+        print(f"{entry['name']:<24}{wall:>20}{speedup:>9.2f}x{rss:>22}")
+
+
+def build_parser() -> ArgumentParser:
+    parser = ArgumentParser(
+        description="Benchmark crawl / render / merge against a local fixture site."
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="bench-results.json",
+        help="Where to write the JSON results (default: bench-results.json)",
+    )
+    parser.add_argument(
+        "--posts", type=int, default=40, help="Number of synthetic posts (default: 40)"
+    )
+    parser.add_argument(
+        "--per-page",
+        type=int,
+        default=10,
+        help="Posts per synthetic category page (default: 10)",
+    )
+    parser.add_argument(
+        "--images-per-post",
+        type=int,
+        default=1,
+        help="Images embedded in each synthetic article (default: 1)",
+    )
+    parser.add_argument(
+        "--image-kb",
+        type=int,
+        default=64,
+        help="Approximate size of each image in KB (default: 64)",
+    )
+    parser.add_argument(
+        "--typeset-ms",
+        type=int,
+        default=300,
+        help="Delay before the fake MathJax typesets formulas (default: 300)",
+    )
+    parser.add_argument(
+        "--delay-ms",
+        type=int,
+        default=500,
+        help="--delay-ms passed to the renderer (default: 500)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=str,
+        default="1,2,4",
+        help="Comma-separated --workers settings to render with (default: 1,2,4)",
+    )
+    parser.add_argument(
+        "--merge-pages",
+        type=str,
+        default="100,1000,10000",
+        help="Comma-separated book sizes for the merge benchmark (default: 100,1000,10000)",
+    )
+    parser.add_argument(
+        "--skip-render",
+        action="store_true",
+        help="Skip the Playwright render cases (crawl and merge only)",
+    )
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("BASELINE", "CANDIDATE"),
+        default=None,
+        help="Compare two result files instead of running the benchmarks",
+    )
+    return parser
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+
+    if args.compare:
+        compare_results(Path(args.compare[0]), Path(args.compare[1]))
+        return
+
+    data = run_benchmarks(args)
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with output_path.open("w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    print(f"[bench] 结果已写入: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
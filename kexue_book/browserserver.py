@@ -0,0 +1,167 @@
+"""A long-lived local Chromium (or pool) that render runs attach to over CDP."""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, List
+import json
+import os
+import socket
+import time
+
+from playwright.sync_api import Error as PlaywrightError
+
+from .assetcache import cache_root
+
+DEFAULT_IDLE_TIMEOUT_S = 900.0
+POLL_SECONDS = 5.0
+CONNECT_TIMEOUT_MS = 10_000
+
+
+def default_endpoint_file() -> Path:
+    return cache_root() / "browser-server.json"
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _write_endpoint_file(path: Path, endpoints: List[str], idle_timeout_s: float) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "pid": os.getpid(),
+                "endpoints": endpoints,
+                "idle_timeout_s": idle_timeout_s,
+                "started_at": datetime.now(timezone.utc).isoformat(),
+            },
+            f,
+            indent=2,
+        )
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def read_endpoints(path: Path) -> List[str]:
+    """CDP endpoints of a running server; empty if the file is missing or stale."""
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            data: dict[str, Any] = json.load(f)
+    except (OSError, ValueError):
+        return []
+    pid = data.get("pid")
+    endpoints = data.get("endpoints")
+    if not isinstance(pid, int) or not isinstance(endpoints, list) or not _pid_alive(pid):
+        return []
+    return [endpoint for endpoint in endpoints if isinstance(endpoint, str)]
+
+
+def launch_or_attach(playwright, endpoint_file: Path | None, slot: int = 0):
+    """
+    Return ``(browser, attached)``.
+
+    With ``endpoint_file`` the browser of a running ``browser-server`` is used
+    (``slot`` picks one of a pool); callers then only open their own context on
+    it and ``browser.close()`` just disconnects. Without a reachable server a
+    private Chromium is launched as before.
+    """
+    if endpoint_file is not None:
+        endpoints = read_endpoints(endpoint_file)
+        if endpoints:
+            endpoint = endpoints[slot % len(endpoints)]
+            try:
+                return (
+                    playwright.chromium.connect_over_cdp(endpoint, timeout=CONNECT_TIMEOUT_MS),
+                    True,
+                )
+            except PlaywrightError as exc:
+                print(f"[render] warn 连接浏览器服务失败，改为自行启动: {endpoint} ({exc})")
+        else:
+            print(f"[render] warn 没有运行中的浏览器服务 ({endpoint_file})，改为自行启动")
+    return playwright.chromium.launch(), False
+
+
+def serve(
+    endpoint_file: Path,
+    pool: int = 1,
+    port: int = 0,
+    idle_timeout_s: float = DEFAULT_IDLE_TIMEOUT_S,
+) -> None:
+    """
+    Run ``pool`` Chromium instances with a local DevTools endpoint until idle.
+
+    Every client opens its own browser context, so cookies, storage and routes
+    never leak between runs; Playwright creates those contexts with
+    ``disposeOnDetach``, so a crashed client does not keep the server busy. The
+    server exits (and removes ``endpoint_file``) after ``idle_timeout_s`` seconds
+    without any client context.
+    """
+    from playwright.sync_api import sync_playwright
+
+    existing = read_endpoints(endpoint_file)
+    if existing:
+        raise RuntimeError(f"浏览器服务已在运行: {', '.join(existing)} ({endpoint_file})")
+
+    with sync_playwright() as p:
+        browsers = []
+        endpoints: List[str] = []
+        try:
+            for i in range(max(1, pool)):
+                debug_port = port + i if port else _free_port()
+                browsers.append(
+                    p.chromium.launch(
+                        args=[
+                            f"--remote-debugging-port={debug_port}",
+                            "--remote-debugging-address=127.0.0.1",
+                        ]
+                    )
+                )
+                endpoints.append(f"http://127.0.0.1:{debug_port}")
+            _write_endpoint_file(endpoint_file, endpoints, idle_timeout_s)
+            print(f"[browser-server] 已启动 {len(endpoints)} 个 Chromium: {', '.join(endpoints)}")
+            print(f"[browser-server] 连接信息: {endpoint_file}；空闲 {idle_timeout_s:.0f}s 后退出")
+
+            sessions = [browser.new_browser_cdp_session() for browser in browsers]
+            idle_since = time.monotonic()
+            last_active = -1
+            while True:
+                time.sleep(POLL_SECONDS)
+                if not all(browser.is_connected() for browser in browsers):
+                    print("[browser-server] warn Chromium 已退出，停止服务")
+                    break
+                # 客户端各自创建的上下文；默认上下文不计入
+                active = sum(
+                    len(session.send("Target.getBrowserContexts")["browserContextIds"])
+                    for session in sessions
+                )
+                if active != last_active:
+                    print(f"[browser-server] 活跃客户端上下文: {active}")
+                    last_active = active
+                if active:
+                    idle_since = time.monotonic()
+                elif time.monotonic() - idle_since >= idle_timeout_s:
+                    print(f"[browser-server] 空闲超过 {idle_timeout_s:.0f}s，退出")
+                    break
+        finally:
+            if read_endpoints(endpoint_file) == endpoints:
+                endpoint_file.unlink(missing_ok=True)
+            for browser in browsers:
+                try:
+                    browser.close()
+                except PlaywrightError:
+                    pass
@@ -0,0 +1,126 @@
+"""Chapter PDF validation: page counts plus the file fingerprint stored in the manifest."""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+import hashlib
+import io
+import os
+
+from pypdf import PdfReader
+
+# Below this many chapters the process pool costs more than it saves.
+PARALLEL_THRESHOLD = 16
+
+
+@dataclass(frozen=True)
+class ChapterInfo:
+    page_count: int
+    file_size: int
+    mtime_ns: int
+    sha256: str
+
+
+def file_signature(path: Path) -> tuple[int, int] | None:
+    """Return ``(size, mtime_ns)`` or None if the file is missing."""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def inspect_pdf_bytes(data: bytes) -> tuple[int, str] | None:
+    """Return ``(page_count, sha256)`` for an in-memory PDF; None if unreadable or empty."""
+    try:
+        page_count = len(PdfReader(io.BytesIO(data)).pages)
+    except Exception:
+        return None
+    if page_count <= 0:
+        return None
+    return page_count, hashlib.sha256(data).hexdigest()
+
+
+def inspect_chapter(path: Path) -> ChapterInfo | None:
+    """Read a chapter once, hash it and count its pages; None if missing, unreadable or empty."""
+    signature = file_signature(path)
+    if signature is None or not path.is_file():
+        return None
+
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None
+    checked = inspect_pdf_bytes(data)
+    if checked is None:
+        return None
+
+    return ChapterInfo(
+        page_count=checked[0],
+        file_size=signature[0],
+        mtime_ns=signature[1],
+        sha256=checked[1],
+    )
+
+
+def store_chapter(path: Path, data: bytes, page_count: int, sha256: str) -> ChapterInfo:
+    """Write an already validated chapter to the on-disk cache and return its fingerprint."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    try:
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    stat = path.stat()
+    return ChapterInfo(
+        page_count=page_count,
+        file_size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+        sha256=sha256,
+    )
+
+
+def first_valid_chapter(paths: Iterable[Path]) -> tuple[Path, ChapterInfo] | None:
+    for path in paths:
+        info = inspect_chapter(path)
+        if info is not None:
+            return path, info
+    return None
+
+
+def find_valid_chapters(
+    candidates: dict[int, list[Path]], workers: int | None = None
+) -> dict[int, tuple[Path, ChapterInfo]]:
+    """
+    Validate candidate paths for many chapters, keyed by task index.
+
+    For each index the first valid candidate wins. Parsing is CPU-bound pure
+    Python, so large batches are spread over a process pool.
+    """
+    items = [(index, paths) for index, paths in candidates.items() if paths]
+    if not items:
+        return {}
+
+    if len(items) < PARALLEL_THRESHOLD:
+        results = [first_valid_chapter(paths) for _, paths in items]
+    else:
+        max_workers = max(1, min(workers or os.cpu_count() or 1, len(items)))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(
+                executor.map(
+                    first_valid_chapter,
+                    [paths for _, paths in items],
+                    chunksize=max(1, len(items) // (max_workers * 4)),
+                )
+            )
+
+    return {
+        index: result
+        for (index, _), result in zip(items, results)
+        if result is not None
+    }
@@ -1,13 +1,37 @@
 from __future__ import annotations
 
-from argparse import ArgumentParser
-from datetime import datetime
+from argparse import ArgumentParser, Namespace
+from datetime import date, datetime
 from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Sequence
+import json
+import sys
+import time
 
-from .crawl import crawl_posts
-from .merge import merge_pdfs
-from .render import render_posts_to_pdfs
-from .types import Post
+# crawl / render / merge 在各自的子命令里按需导入，避免 --help、status 等轻量操作
+# 加载 Playwright、pypdf 和 ReportLab。
+from .profiles import DEFAULT_PROFILE, PROFILES, get_profile, mismatched_records, profile_artifact
+from .types import Post, RenderRecord
+
+if TYPE_CHECKING:
+    from .render import RenderOptions
+
+COMMANDS = (
+    "crawl",
+    "render",
+    "merge",
+    "status",
+    "build",
+    "plan",
+    "watch",
+    "distribute",
+    "worker",
+    "browser-server",
+    "index",
+    "search",
+)
+POST_LIST_NAME = "posts.json"
+MANIFEST_NAME = "manifest.json"
 
 
 def _split_keywords(values: list[str] | None) -> list[str]:
@@ -61,10 +85,16 @@ def _filter_posts_by_title(
     return filtered
 
 
-def build_parser() -> ArgumentParser:
-    parser = ArgumentParser(
-        description="Build a PDF book from Scientific Spaces Big-Data posts."
+def _add_output_args(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--out-dir",
+        type=str,
+        default="output",
+        help="Output directory (default: output)",
     )
+
+
+def _add_select_args(parser: ArgumentParser) -> None:
     parser.add_argument(
         "--start", type=str, required=True, help="Start date YYYY-MM-DD (inclusive)"
     )
@@ -72,51 +102,67 @@ def build_parser() -> ArgumentParser:
         "--end", type=str, required=True, help="End date YYYY-MM-DD (inclusive)"
     )
     parser.add_argument(
-        "--out-dir",
-        type=str,
-        default="output",
-        help="Output directory (default: output)",
+        "--limit", type=int, default=None, help="Debug: only process first N posts"
     )
+    _add_source_args(parser)
+    _add_filter_args(parser)
+    _add_content_args(parser)
+
+
+def _add_index_args(parser: ArgumentParser) -> None:
     parser.add_argument(
-        "--name",
+        "--index",
         type=str,
-        default="BigData",
-        help="Book name prefix (default: BigData)",
-    )
-    parser.add_argument(
-        "--limit", type=int, default=None, help="Debug: only process first N posts"
+        default=None,
+        help="Full-text index database (default: OUT_DIR/content-index.sqlite)",
     )
     parser.add_argument(
-        "--delay-ms",
+        "--fetch-workers",
         type=int,
-        default=4000,
-        help="Extra wait time for MathJax rendering in milliseconds (default: 4000)",
+        default=8,
+        help="Concurrent article fetches when updating the index (default: 8)",
     )
 
+
+def _add_content_args(parser: ArgumentParser) -> None:
     parser.add_argument(
-        "--order",
-        choices=("asc", "desc"),
-        default="asc",
-        help="Sort posts by date: asc or desc (default: asc)",
+        "--content-keyword",
+        action="append",
+        default=None,
+        metavar="TEXT",
+        help="Only keep posts whose body contains this keyword (uses the full-text index); repeat or comma-separate for multiple keywords",
     )
     parser.add_argument(
-        "--cover",
-        action="store_true",
-        help="Add a cover page titled '苏剑林选集' at the beginning",
+        "--content-match",
+        choices=("any", "all"),
+        default="any",
+        help="How --content-keyword values are matched: any or all (default: any)",
     )
     parser.add_argument(
-        "--no-page-numbers",
-        dest="page_numbers",
-        action="store_false",
-        help="Disable printing page numbers on each page",
+        "--content-top",
+        type=int,
+        default=None,
+        help="Keep only the N best-ranked posts for --content-keyword",
     )
-    parser.set_defaults(page_numbers=True)
+    _add_index_args(parser)
+
+
+def _add_source_args(parser: ArgumentParser) -> None:
     parser.add_argument(
-        "--workers",
-        type=int,
-        default=1,
-        help="Number of parallel render workers (default: 1)",
+        "--category-url",
+        type=str,
+        default=None,
+        help="Category page to crawl (default: the Scientific Spaces Big-Data category)",
     )
+    parser.add_argument(
+        "--order",
+        choices=("asc", "desc"),
+        default="asc",
+        help="Sort posts by date: asc or desc (default: asc)",
+    )
+
+
+def _add_filter_args(parser: ArgumentParser) -> None:
     parser.add_argument(
         "--title-keyword",
         action="append",
@@ -142,29 +188,465 @@ def build_parser() -> ArgumentParser:
         action="store_true",
         help="Make title keyword matching case-sensitive",
     )
+
+
+def _add_asset_cache_arg(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--asset-cache",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="DIR",
+        help=(
+            "Serve CSS, JS, fonts and images from a persistent on-disk cache shared by "
+            "all workers and runs (default DIR: ~/.cache/kexue_book/assets)"
+        ),
+    )
+
+
+def _add_browser_server_arg(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--browser-server",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="FILE",
+        help=(
+            "Attach to a running browser-server through its endpoint file instead of "
+            "launching Chromium; falls back to launching (default FILE: "
+            "~/.cache/kexue_book/browser-server.json)"
+        ),
+    )
+
+
+def _add_profile_arg(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--profile",
+        choices=tuple(PROFILES),
+        default=DEFAULT_PROFILE,
+        help=(
+            "Render profile: "
+            + "; ".join(f"{name} ({profile.description})" for name, profile in PROFILES.items())
+            + ". Non-standard profiles use their own chapters-PROFILE/ and "
+            f"manifest-PROFILE.json (default: {DEFAULT_PROFILE})"
+        ),
+    )
+
+
+def _add_render_args(parser: ArgumentParser, local_workers: bool = True) -> None:
+    parser.add_argument(
+        "--delay-ms",
+        type=int,
+        default=4000,
+        help="Extra wait time for MathJax rendering in milliseconds (default: 4000)",
+    )
+    if local_workers:
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of parallel render workers (default: 1)",
+        )
+        parser.add_argument(
+            "--max-task-attempts",
+            type=int,
+            default=2,
+            help="Give up on a post after it crashed this many render workers (default: 2)",
+        )
     parser.add_argument(
         "--resume",
         action="store_true",
         help="Reuse existing valid chapter PDFs and render only missing/invalid ones",
     )
+    parser.add_argument(
+        "--check-changes",
+        action="store_true",
+        help="With --resume, probe reused articles concurrently and re-render the ones edited since",
+    )
+    parser.add_argument(
+        "--check-workers",
+        type=int,
+        default=16,
+        help="Concurrent requests for --check-changes (default: 16)",
+    )
+    _add_profile_arg(parser)
+    _add_asset_cache_arg(parser)
+    _add_browser_server_arg(parser)
     parser.add_argument(
         "--retry-failed",
         action="store_true",
         help="Retry only posts marked as failed in the previous manifest.json",
     )
+    parser.add_argument(
+        "--print-mode",
+        choices=("stream", "buffer"),
+        default="stream",
+        help=(
+            "stream: read the PDF from Chromium in chunks straight into the chapter file "
+            "(falls back to buffer if unavailable); buffer: page.pdf() (default: stream)"
+        ),
+    )
+
+
+def _add_merge_args(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--name",
+        type=str,
+        default="BigData",
+        help="Book name prefix (default: BigData)",
+    )
+    parser.add_argument(
+        "--cover",
+        action="store_true",
+        help="Add a cover page titled '苏剑林选集' at the beginning",
+    )
+    parser.add_argument(
+        "--no-page-numbers",
+        dest="page_numbers",
+        action="store_false",
+        help="Disable printing page numbers on each page",
+    )
+    parser.set_defaults(page_numbers=True)
+
+
+def _add_merge_mode_arg(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--merge-mode",
+        choices=("stream", "batch"),
+        default="stream",
+        help=(
+            "stream: append each chapter to the book while the rest are still rendering, "
+            "in index order; batch: merge after rendering has finished (default: stream)"
+        ),
+    )
+
+
+def build_parser() -> ArgumentParser:
+    parser = ArgumentParser(
+        description="Build a PDF book from Scientific Spaces Big-Data posts."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True, metavar="COMMAND")
+
+    crawl_parser = subparsers.add_parser(
+        "crawl", help=f"Crawl and filter posts, then save {POST_LIST_NAME}"
+    )
+    _add_output_args(crawl_parser)
+    _add_select_args(crawl_parser)
+
+    render_parser = subparsers.add_parser(
+        "render", help=f"Render posts from {POST_LIST_NAME} and write {MANIFEST_NAME}"
+    )
+    _add_output_args(render_parser)
+    _add_render_args(render_parser)
+
+    merge_parser = subparsers.add_parser(
+        "merge", help=f"Merge successful chapters listed in {MANIFEST_NAME} into a book"
+    )
+    _add_output_args(merge_parser)
+    _add_profile_arg(merge_parser)
+    _add_merge_args(merge_parser)
+
+    status_parser = subparsers.add_parser(
+        "status", help="Summarize the artifacts in the output directory"
+    )
+    _add_output_args(status_parser)
+
+    build_parser_ = subparsers.add_parser(
+        "build", help="Run crawl, render and merge in one go"
+    )
+    _add_output_args(build_parser_)
+    _add_select_args(build_parser_)
+    _add_render_args(build_parser_)
+    build_parser_.add_argument(
+        "--in-memory",
+        action="store_true",
+        help="Validate chapters in memory and hand them to merge without re-reading them from disk",
+    )
+    build_parser_.add_argument(
+        "--in-memory-max-mb",
+        type=int,
+        default=1024,
+        help="Memory budget for --in-memory chapter buffers; the rest is read from disk (default: 1024)",
+    )
+    _add_merge_args(build_parser_)
+    _add_merge_mode_arg(build_parser_)
+
+    plan_parser = subparsers.add_parser(
+        "plan",
+        help=f"Estimate the render wall time for {POST_LIST_NAME} from the render history",
+    )
+    _add_output_args(plan_parser)
+    plan_parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of parallel render workers to plan for (default: 1)",
+    )
+    plan_parser.add_argument(
+        "--delay-ms",
+        type=int,
+        default=4000,
+        help="Extra wait time for MathJax rendering in milliseconds (default: 4000)",
+    )
+    _add_profile_arg(plan_parser)
+    plan_parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Leave out posts whose chapter PDF would be reused by render --resume",
+    )
+    plan_parser.add_argument(
+        "--index",
+        type=str,
+        default=None,
+        help="Full-text index used to size posts without history (default: OUT_DIR/content-index.sqlite)",
+    )
+    plan_parser.add_argument(
+        "--top",
+        type=int,
+        default=10,
+        help="Number of longest posts to list (default: 10)",
+    )
+
+    watch_parser = subparsers.add_parser(
+        "watch",
+        help="Keep a warm browser, poll the first category page and update the book",
+    )
+    _add_output_args(watch_parser)
+    watch_parser.add_argument(
+        "--start",
+        type=str,
+        default=None,
+        help=f"Ignore posts before YYYY-MM-DD (default: the start saved in {POST_LIST_NAME})",
+    )
+    _add_source_args(watch_parser)
+    _add_filter_args(watch_parser)
+    _add_content_args(watch_parser)
+    watch_parser.add_argument(
+        "--delay-ms",
+        type=int,
+        default=4000,
+        help="Extra wait time for MathJax rendering in milliseconds (default: 4000)",
+    )
+    _add_profile_arg(watch_parser)
+    _add_asset_cache_arg(watch_parser)
+    _add_browser_server_arg(watch_parser)
+    _add_merge_args(watch_parser)
+    watch_parser.add_argument(
+        "--interval",
+        type=float,
+        default=600,
+        help="Seconds between polls of the first category page (default: 600)",
+    )
+    watch_parser.add_argument(
+        "--max-polls",
+        type=int,
+        default=None,
+        help="Stop after N polls (default: run until interrupted)",
+    )
+    watch_parser.add_argument(
+        "--book",
+        type=str,
+        default=None,
+        help="Path of the continuously updated book (default: OUT_DIR/NAME-latest.pdf)",
+    )
+
+    distribute_parser = subparsers.add_parser(
+        "distribute",
+        help=f"Render {POST_LIST_NAME} through a lease-based queue shared by worker hosts",
+    )
+    _add_output_args(distribute_parser)
+    _add_render_args(distribute_parser, local_workers=False)
+    _add_merge_args(distribute_parser)
+    _add_merge_mode_arg(distribute_parser)
+    distribute_parser.add_argument(
+        "--local-workers",
+        type=int,
+        default=0,
+        help="Worker processes to start on this machine (default: 0, remote workers only)",
+    )
+    distribute_parser.add_argument(
+        "--lease-seconds",
+        type=float,
+        default=300,
+        help="How long a claimed task stays leased without a heartbeat (default: 300)",
+    )
+    distribute_parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=3,
+        help="Give up on a task after this many leases (default: 3)",
+    )
+    distribute_parser.add_argument(
+        "--no-merge",
+        dest="merge",
+        action="store_false",
+        help="Only render and write the manifest; run merge separately",
+    )
+
+    worker_parser = subparsers.add_parser(
+        "worker", help="Claim and render tasks from a distribute queue"
+    )
+    worker_parser.add_argument(
+        "--queue",
+        type=str,
+        required=True,
+        help="Path of the queue database (OUT_DIR/render-queue.sqlite on the shared filesystem)",
+    )
+    worker_parser.add_argument(
+        "--worker-id",
+        type=str,
+        default=None,
+        help="Name used for leases (default: HOSTNAME:PID)",
+    )
+    worker_parser.add_argument(
+        "--lease-seconds",
+        type=float,
+        default=300,
+        help="Lease duration; must match the coordinator (default: 300)",
+    )
+    worker_parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=60,
+        help=(
+            "Exit after the queue has had no claimable task and no task leased by "
+            "another worker for this long (default: 60)"
+        ),
+    )
+    _add_asset_cache_arg(worker_parser)
+    _add_browser_server_arg(worker_parser)
+
+    server_parser = subparsers.add_parser(
+        "browser-server",
+        help="Keep Chromium running so render runs on this machine can attach to it",
+    )
+    server_parser.add_argument(
+        "--endpoint-file",
+        type=str,
+        default=None,
+        help="Where clients find the server (default: ~/.cache/kexue_book/browser-server.json)",
+    )
+    server_parser.add_argument(
+        "--pool",
+        type=int,
+        default=1,
+        help="Number of Chromium instances; parallel workers are spread over them (default: 1)",
+    )
+    server_parser.add_argument(
+        "--port",
+        type=int,
+        default=0,
+        help="First local DevTools port; the pool uses consecutive ports (default: any free port)",
+    )
+    server_parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=900,
+        help="Exit after this many seconds without any attached client (default: 900)",
+    )
+
+    index_parser = subparsers.add_parser(
+        "index", help=f"Fetch article bodies for {POST_LIST_NAME} into the full-text index"
+    )
+    _add_output_args(index_parser)
+    _add_index_args(index_parser)
+    index_parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Re-fetch articles that are already indexed",
+    )
+
+    search_parser = subparsers.add_parser(
+        "search", help="Query the full-text index and print ranked posts"
+    )
+    _add_output_args(search_parser)
+    search_parser.add_argument("keywords", nargs="+", metavar="KEYWORD")
+    search_parser.add_argument(
+        "--index",
+        type=str,
+        default=None,
+        help="Full-text index database (default: OUT_DIR/content-index.sqlite)",
+    )
+    search_parser.add_argument(
+        "--match",
+        choices=("any", "all"),
+        default="any",
+        help="Match any or all keywords (default: any)",
+    )
+    search_parser.add_argument(
+        "--top", type=int, default=20, help="Number of results to print (default: 20)"
+    )
 
     return parser
 
 
-def main() -> None:
-    parser = build_parser()
-    args = parser.parse_args()
+def _normalize_argv(argv: Sequence[str]) -> list[str]:
+    # 兼容旧的无子命令调用方式：python -m kexue_book.cli --start ... 等价于 build。
+    argv = list(argv)
+    if argv and argv[0] not in COMMANDS and argv[0] not in ("-h", "--help"):
+        return ["build", *argv]
+    return argv
 
-    start_date = datetime.strptime(args.start, "%Y-%m-%d").date()
-    end_date = datetime.strptime(args.end, "%Y-%m-%d").date()
+
+def _parse_date(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def _apply_title_filter(args: Namespace, posts: list[Post]) -> list[Post]:
+    include_keywords = _split_keywords(args.title_keyword)
+    exclude_keywords = _split_keywords(args.exclude_title_keyword)
+    if not include_keywords and not exclude_keywords:
+        return posts
+    return _filter_posts_by_title(
+        posts,
+        include_keywords=include_keywords,
+        exclude_keywords=exclude_keywords,
+        include_match=args.title_match,
+        case_sensitive=args.title_case_sensitive,
+    )
+
+
+def _index_path(args: Namespace) -> Path:
+    from .index import INDEX_NAME
+
+    return Path(args.index) if args.index else Path(args.out_dir) / INDEX_NAME
+
+
+def _filter_posts_by_content(
+    args: Namespace, posts: list[Post], keywords: list[str]
+) -> tuple[list[Post], list[Post]]:
+    """Return ``(matching posts, posts whose body could not be fetched)``."""
+    from .index import ContentIndex
+
+    with ContentIndex(_index_path(args)) as index:
+        indexed, failed = index.update(posts, fetch_workers=args.fetch_workers)
+        if indexed or failed:
+            print(f"[index] 新索引 {indexed} 篇，失败 {failed} 篇")
+        hits = index.search(keywords, match=args.content_match)
+        indexed_urls = index.indexed_urls()
+    unindexed = [post for post in posts if post.url not in indexed_urls]
+
+    wanted = {post.url for post in posts}
+    ranked_urls = [hit.url for hit in hits if hit.url in wanted]
+    if args.content_top is not None:
+        ranked_urls = ranked_urls[: args.content_top]
+    keep = set(ranked_urls)
+    # 排名只决定保留哪些文章，书中仍按 --order 的日期顺序排列
+    return [post for post in posts if post.url in keep], unindexed
+
+
+def _run_crawl(args: Namespace) -> tuple[list[Post], date, date]:
+    from .crawl import crawl_posts
+    from .manifest import save_post_list
+
+    start_date = _parse_date(args.start)
+    end_date = _parse_date(args.end)
 
     print(f"[crawl] 区间: {start_date} ~ {end_date}")
-    posts = crawl_posts(start_date, end_date)
+    if args.category_url:
+        posts = crawl_posts(start_date, end_date, base_url=args.category_url)
+    else:
+        posts = crawl_posts(start_date, end_date)
     print(f"[crawl] 命中文章数: {len(posts)}")
 
     if args.order == "desc":
@@ -174,13 +656,7 @@ def main() -> None:
     exclude_keywords = _split_keywords(args.exclude_title_keyword)
     if include_keywords or exclude_keywords:
         before_filter = len(posts)
-        posts = _filter_posts_by_title(
-            posts,
-            include_keywords=include_keywords,
-            exclude_keywords=exclude_keywords,
-            include_match=args.title_match,
-            case_sensitive=args.title_case_sensitive,
-        )
+        posts = _apply_title_filter(args, posts)
         print(
             f"[filter] 标题关键词过滤: {before_filter} -> {len(posts)} 篇"
         )
@@ -189,6 +665,13 @@ def main() -> None:
         if exclude_keywords:
             print(f"[filter] 排除关键词: {', '.join(exclude_keywords)}")
 
+    content_keywords = _split_keywords(args.content_keyword)
+    if content_keywords:
+        before_filter = len(posts)
+        posts, _ = _filter_posts_by_content(args, posts, content_keywords)
+        print(f"[filter] 正文关键词过滤: {before_filter} -> {len(posts)} 篇")
+        print(f"[filter] 正文关键词({args.content_match}): {', '.join(content_keywords)}")
+
     if args.limit:
         before_limit = len(posts)
         posts = posts[: args.limit]
@@ -197,29 +680,26 @@ def main() -> None:
     if not posts:
         raise SystemExit("[error] 指定区间没有命中文章，已退出。")
 
-    out_dir = Path(args.out_dir)
-    chapters_dir = out_dir / "chapters"
-    manifest_path = out_dir / "manifest.json"
+    post_list_path = Path(args.out_dir) / POST_LIST_NAME
+    save_post_list(post_list_path, posts, start_date, end_date)
+    print(f"[crawl] 文章列表已保存: {post_list_path}")
+    return posts, start_date, end_date
 
-    if args.retry_failed and not manifest_path.exists():
-        raise SystemExit(f"[error] --retry-failed 找不到 manifest: {manifest_path}")
 
-    render_output = render_posts_to_pdfs(
-        posts,
-        chapters_dir,
-        delay_ms=args.delay_ms,
-        workers=args.workers,
-        manifest_path=manifest_path,
-        resume=args.resume,
-        retry_failed=args.retry_failed,
-    )
+def _load_posts(out_dir: Path) -> tuple[list[Post], date, date]:
+    from .manifest import load_post_list
 
-    success_records = [
-        record for record in render_output.records if record.status == "success"
-    ]
-    failed_records = [
-        record for record in render_output.records if record.status != "success"
-    ]
+    post_list_path = out_dir / POST_LIST_NAME
+    if not post_list_path.exists():
+        raise SystemExit(
+            f"[error] 找不到文章列表 {post_list_path}，请先运行 crawl 子命令。"
+        )
+    return load_post_list(post_list_path)
+
+
+def _report_records(records: list[RenderRecord], manifest_path: Path) -> None:
+    success_records = [record for record in records if record.status == "success"]
+    failed_records = [record for record in records if record.status != "success"]
     print(
         f"[check] 渲染完整性: 成功 {len(success_records)} 篇，"
         f"失败 {len(failed_records)} 篇；manifest: {manifest_path}"
@@ -231,23 +711,500 @@ def main() -> None:
             print(f"  - #{record.index:03d} {record.post.url} ({reason})")
         print("[check] 将只合并成功生成且可读取的章节 PDF。")
 
+
+def _asset_cache_dir(args: Namespace) -> Path | None:
+    if args.asset_cache is None:
+        return None
+    if args.asset_cache:
+        return Path(args.asset_cache)
+    from .assetcache import default_cache_dir
+
+    return default_cache_dir()
+
+
+def _check_changes_needs_resume(args: Namespace) -> None:
+    if args.check_changes and not (args.resume or args.retry_failed):
+        raise SystemExit("[error] --check-changes 只检查复用的章节，需要同时指定 --resume。")
+
+
+def _browser_server_file(args: Namespace) -> Path | None:
+    if args.browser_server is None:
+        return None
+    if args.browser_server:
+        return Path(args.browser_server)
+    from .browserserver import default_endpoint_file
+
+    return default_endpoint_file()
+
+
+def _manifest_path(args: Namespace) -> Path:
+    return Path(args.out_dir) / profile_artifact(MANIFEST_NAME, args.profile)
+
+
+def _chapters_dir(args: Namespace) -> Path:
+    return Path(args.out_dir) / profile_artifact("chapters", args.profile)
+
+
+def _render_options(args: Namespace) -> RenderOptions:
+    from .render import RenderOptions
+
+    return RenderOptions(
+        delay_ms=args.delay_ms,
+        profile=get_profile(args.profile),
+        resume=args.resume,
+        retry_failed=args.retry_failed,
+        check_changes=args.check_changes,
+        check_workers=args.check_workers,
+        asset_cache_dir=_asset_cache_dir(args),
+        stream_pdf=args.print_mode == "stream",
+        browser_server=_browser_server_file(args),
+    )
+
+
+def _run_render(
+    args: Namespace,
+    posts: list[Post],
+    on_record: Callable[[RenderRecord], None] | None = None,
+) -> list[RenderRecord]:
+    """Render ``posts``; successful records may carry in-memory PDF data (``--in-memory``)."""
+    from .render import render_posts_to_pdfs
+
+    chapters_dir = _chapters_dir(args)
+    manifest_path = _manifest_path(args)
+
+    if args.retry_failed and not manifest_path.exists():
+        raise SystemExit(f"[error] --retry-failed 找不到 manifest: {manifest_path}")
+    _check_changes_needs_resume(args)
+
+    render_output = render_posts_to_pdfs(
+        posts,
+        chapters_dir,
+        _render_options(args),
+        workers=args.workers,
+        manifest_path=manifest_path,
+        in_memory=getattr(args, "in_memory", False),
+        in_memory_max_mb=getattr(args, "in_memory_max_mb", 1024),
+        max_task_attempts=args.max_task_attempts,
+        on_record=on_record,
+    )
+    _report_records(render_output.records, manifest_path)
+
     if not render_output.rendered_posts:
         raise SystemExit("[error] 没有成功渲染任何文章，已退出。")
     if len(render_output.pdf_paths) != len(render_output.rendered_posts):
         raise SystemExit("[error] 渲染结果数量不一致，请重试。")
+    return render_output.records
+
+
+def _book_path(args: Namespace, start: date, end: date) -> Path:
+    return Path(args.out_dir) / profile_artifact(
+        f"{args.name}-{start.isoformat()}-{end.isoformat()}.pdf", args.profile
+    )
+
+
+def _start_book(args: Namespace, posts: list[Post], start: date, end: date):
+    """An OrderedBookWriter fed while rendering (``--merge-mode stream``), else None."""
+    if args.merge_mode != "stream":
+        return None
+    from .merge import OrderedBookWriter
 
-    book_path = out_dir / f"{args.name}-{args.start}-{args.end}.pdf"
+    return OrderedBookWriter(
+        _book_path(args, start, end),
+        range(1, len(posts) + 1),
+        add_bookmarks=True,
+        add_cover=args.cover,
+        add_page_numbers=args.page_numbers,
+        cover_title="苏剑林选集",
+    )
+
+
+def _finish_book(book, records: list[RenderRecord]) -> Path:
+    if not any(record.status == "success" for record in records):
+        book.abort()
+        raise SystemExit("[error] manifest 中没有成功渲染的文章，已退出。")
+    started = time.monotonic()
+    book_path = book.finish(records)
+    print(
+        f"[merge] 边渲染边合并: {book.chapters} 篇，乱序缓冲最多 {book.max_buffered} 篇；"
+        f"最后一篇完成后 {time.monotonic() - started:.1f}s 写出"
+    )
+    print(f"[done] 书籍已生成，可以拷到 iPad 上阅读： {book_path}")
+    return book_path
+
+
+def _run_merge(
+    args: Namespace, records: list[RenderRecord], start: date, end: date
+) -> Path:
+    from .merge import merge_pdfs
+
+    success_records = [record for record in records if record.status == "success"]
+    if not success_records:
+        raise SystemExit("[error] manifest 中没有成功渲染的文章，已退出。")
+    mismatched = mismatched_records(success_records, args.profile)
+    if mismatched:
+        for record in mismatched[:5]:
+            print(f"[check] 渲染配置不是 {args.profile}: #{record.index:03d} {record.profile} {record.pdf_path}")
+        raise SystemExit(
+            f"[error] {len(mismatched)} 篇章节不是用 {args.profile} 配置渲染的，不能混在同一本书里；"
+            f"请用对应的 --profile 合并或重新渲染。"
+        )
+
+    book_path = _book_path(args, start, end)
     merge_pdfs(
-        render_output.pdf_paths,
-        render_output.rendered_posts,
+        [record.pdf_source for record in success_records],
+        [record.post for record in success_records],
         book_path,
         add_bookmarks=True,
         add_cover=args.cover,
         add_page_numbers=args.page_numbers,
         cover_title="苏剑林选集",
+        page_counts=[record.page_count for record in success_records],
     )
 
     print(f"[done] 书籍已生成，可以拷到 iPad 上阅读： {book_path}")
+    return book_path
+
+
+def _load_records(manifest_path: Path) -> list[RenderRecord]:
+    from .manifest import load_manifest_records
+
+    if not manifest_path.exists():
+        raise SystemExit(
+            f"[error] 找不到 manifest {manifest_path}，请先运行 render 子命令。"
+        )
+    return load_manifest_records(manifest_path)
+
+
+def _cmd_crawl(args: Namespace) -> None:
+    _run_crawl(args)
+
+
+def _cmd_render(args: Namespace) -> None:
+    posts, _, _ = _load_posts(Path(args.out_dir))
+    print(f"[render] 从文章列表读取 {len(posts)} 篇")
+    _run_render(args, posts)
+
+
+def _cmd_merge(args: Namespace) -> None:
+    out_dir = Path(args.out_dir)
+    _, start, end = _load_posts(out_dir)
+    records = _load_records(_manifest_path(args))
+    missing = [
+        record
+        for record in records
+        if record.status == "success" and not record.pdf_path.is_file()
+    ]
+    if missing:
+        for record in missing:
+            print(f"[check] 章节 PDF 已不存在，跳过: #{record.index:03d} {record.pdf_path}")
+        records = [record for record in records if record not in missing]
+    _run_merge(args, records, start, end)
+
+
+def _cmd_status(args: Namespace) -> None:
+    from .manifest import load_manifest_records, load_post_list
+
+    out_dir = Path(args.out_dir)
+    post_list_path = out_dir / POST_LIST_NAME
+    manifest_path = out_dir / MANIFEST_NAME
+
+    if post_list_path.exists():
+        posts, start, end = load_post_list(post_list_path)
+        print(f"[status] 文章列表: {len(posts)} 篇，区间 {start} ~ {end} ({post_list_path})")
+    else:
+        print(f"[status] 文章列表: 无 ({post_list_path})")
+
+    if manifest_path.exists():
+        records = load_manifest_records(manifest_path)
+        success_records = [record for record in records if record.status == "success"]
+        pages = sum(record.page_count or 0 for record in success_records)
+        print(
+            f"[status] manifest: 成功 {len(success_records)} 篇，"
+            f"失败 {len(records) - len(success_records)} 篇，共 {pages} 页 ({manifest_path})"
+        )
+        measured = [record for record in success_records if record.browser_peak_rss is not None]
+        if measured:
+            heaviest = max(measured, key=lambda record: record.browser_peak_rss or 0)
+            print(
+                f"[status] 渲染峰值内存最高: #{heaviest.index:03d} {heaviest.post.title} "
+                f"浏览器 {heaviest.browser_peak_rss / (1024 * 1024):.0f} MB，"
+                f"worker {(heaviest.worker_peak_rss or 0) / (1024 * 1024):.0f} MB"
+            )
+    else:
+        print(f"[status] manifest: 无 ({manifest_path})")
+
+    for profile in PROFILES:
+        profile_manifest = out_dir / profile_artifact(MANIFEST_NAME, profile)
+        if profile != DEFAULT_PROFILE and profile_manifest.exists():
+            records = load_manifest_records(profile_manifest)
+            success_count = len([record for record in records if record.status == "success"])
+            print(f"[status] manifest ({profile}): 成功 {success_count} 篇 ({profile_manifest})")
+
+    watch_status_path = out_dir / "watch-status.json"
+    if watch_status_path.exists():
+        with watch_status_path.open("r", encoding="utf-8") as f:
+            watch_status = json.load(f)
+        latency = watch_status.get("latency_seconds", {}).get("detect_to_pdf", {})
+        print(
+            f"[status] watch: {'健康' if watch_status.get('healthy') else '异常'}，"
+            f"轮询 {watch_status.get('polls')} 次（失败 {watch_status.get('poll_errors')}），"
+            f"新文章 {watch_status.get('posts_rendered')} 篇，"
+            f"发现到成书平均 {latency.get('mean') or '-'}s，更新于 {watch_status.get('updated_at')}"
+        )
+
+    for book_path in sorted(out_dir.glob("*.pdf")):
+        size_mb = book_path.stat().st_size / (1024 * 1024)
+        print(f"[status] 书籍: {book_path} ({size_mb:.1f} MB)")
+
+
+def _cmd_build(args: Namespace) -> None:
+    posts, start, end = _run_crawl(args)
+    book = _start_book(args, posts, start, end)
+    if book is None:
+        records = _run_render(args, posts)
+        _run_merge(args, records, start, end)
+        return
+    try:
+        records = _run_render(args, posts, on_record=book.add)
+    except BaseException:
+        book.abort()
+        raise
+    _finish_book(book, records)
+
+
+def _cmd_plan(args: Namespace) -> None:
+    from collections import Counter
+
+    from .schedule import HISTORY_NAME, format_duration, load_duration_model, simulate_makespan
+
+    out_dir = Path(args.out_dir)
+    manifest_path = _manifest_path(args)
+    profile = get_profile(args.profile)
+    posts, _, _ = _load_posts(out_dir)
+    reused = 0
+    if args.resume:
+        from .render import make_task, select_tasks
+
+        tasks = [
+            make_task(index, post, _chapters_dir(args))
+            for index, post in enumerate(posts, start=1)
+        ]
+        tasks, prefilled = select_tasks(
+            tasks, manifest_path, resume=True, retry_failed=False, profile=profile
+        )
+        reused = len(prefilled)
+        posts = [task.post for task in tasks]
+
+    model = load_duration_model(
+        out_dir,
+        profile.effective_delay_ms(args.delay_ms),
+        manifest_path=manifest_path,
+        index_path=_index_path(args),
+        history_name=profile_artifact(HISTORY_NAME, profile.name),
+    )
+    estimates = [(model.estimate(post), post) for post in posts]
+    sources = Counter(estimate.source for estimate, _ in estimates)
+    print(
+        f"[plan] 待渲染 {len(posts)} 篇，复用 {reused} 篇；估算依据: "
+        f"历史 {sources['history']}，页数 {sources['pages']}，"
+        f"正文长度 {sources['text']}，默认值 {sources['default']}"
+    )
+    if not estimates:
+        return
+
+    in_date_order = [estimate.seconds for estimate, _ in estimates]
+    longest = sorted(in_date_order, reverse=True)
+    workers = max(1, args.workers)
+    total = sum(in_date_order)
+    print(f"[plan] 单篇耗时合计 {format_duration(total)}，最长一篇 {format_duration(longest[0])}")
+    print(
+        f"[plan] workers={workers}: 最长优先预计 {format_duration(simulate_makespan(longest, workers))}，"
+        f"按日期顺序预计 {format_duration(simulate_makespan(in_date_order, workers))}，"
+        f"下限 {format_duration(max(longest[0], total / workers))}"
+    )
+    if args.top > 0:
+        print(f"[plan] 最长的 {min(args.top, len(estimates))} 篇:")
+        ranked = sorted(estimates, key=lambda item: item[0].seconds, reverse=True)
+        for estimate, post in ranked[: args.top]:
+            print(
+                f"  {format_duration(estimate.seconds)}  ({estimate.source})  "
+                f"{post.date}  {post.title}  {post.url}"
+            )
+
+
+def _cmd_watch(args: Namespace) -> None:
+    from .crawl import BASE_CATEGORY_URL
+    from .manifest import load_post_list
+    from .watch import watch_posts
+
+    out_dir = Path(args.out_dir)
+    post_list_path = out_dir / POST_LIST_NAME
+    if post_list_path.exists():
+        posts, start, end = load_post_list(post_list_path)
+    elif args.start:
+        posts, start, end = [], _parse_date(args.start), _parse_date(args.start)
+        print(f"[watch] 没有 {post_list_path}，只跟踪之后新发布的文章")
+    else:
+        raise SystemExit(
+            f"[error] 找不到文章列表 {post_list_path}，请先运行 crawl 或指定 --start。"
+        )
+    if args.start:
+        start = _parse_date(args.start)
+
+    book_path = (
+        Path(args.book)
+        if args.book
+        else out_dir / profile_artifact(f"{args.name}-latest.pdf", args.profile)
+    )
+    content_keywords = _split_keywords(args.content_keyword)
+
+    def post_filter(new_posts: list[Post]) -> tuple[list[Post], list[Post]]:
+        # 与 crawl 相同：先按标题，再按正文关键词（--content-top 作用于每批新文章）
+        new_posts = _apply_title_filter(args, new_posts)
+        if content_keywords and new_posts:
+            return _filter_posts_by_content(args, new_posts, content_keywords)
+        return new_posts, []
+
+    try:
+        watch_posts(
+            posts,
+            start,
+            end,
+            out_dir,
+            book_path,
+            interval_s=args.interval,
+            delay_ms=args.delay_ms,
+            order=args.order,
+            category_url=args.category_url or BASE_CATEGORY_URL,
+            post_filter=post_filter,
+            merge_options={
+                "add_cover": args.cover,
+                "add_page_numbers": args.page_numbers,
+                "cover_title": "苏剑林选集",
+            },
+            max_polls=args.max_polls,
+            asset_cache_dir=_asset_cache_dir(args),
+            browser_server=_browser_server_file(args),
+            profile=get_profile(args.profile),
+        )
+    except KeyboardInterrupt:
+        print("[watch] 已停止")
+
+
+def _cmd_distribute(args: Namespace) -> None:
+    from .distributed import coordinate_render
+
+    out_dir = Path(args.out_dir)
+    manifest_path = _manifest_path(args)
+    if args.retry_failed and not manifest_path.exists():
+        raise SystemExit(f"[error] --retry-failed 找不到 manifest: {manifest_path}")
+
+    _check_changes_needs_resume(args)
+
+    posts, start, end = _load_posts(out_dir)
+    book = _start_book(args, posts, start, end) if args.merge else None
+    try:
+        records = coordinate_render(
+            posts,
+            out_dir,
+            _render_options(args),
+            manifest_path=manifest_path,
+            local_workers=args.local_workers,
+            lease_seconds=args.lease_seconds,
+            max_attempts=args.max_attempts,
+            on_record=book.add if book is not None else None,
+        )
+    except BaseException:
+        if book is not None:
+            book.abort()
+        raise
+    _report_records(records, manifest_path)
+    if book is not None:
+        _finish_book(book, records)
+    elif args.merge:
+        _run_merge(args, records, start, end)
+
+
+def _cmd_worker(args: Namespace) -> None:
+    from .distributed import run_worker
+
+    completed = run_worker(
+        Path(args.queue),
+        worker_id=args.worker_id,
+        lease_seconds=args.lease_seconds,
+        idle_timeout=args.idle_timeout,
+        asset_cache_dir=_asset_cache_dir(args),
+        browser_server=_browser_server_file(args),
+    )
+    print(f"[worker] 完成 {completed} 篇，退出")
+
+
+def _cmd_browser_server(args: Namespace) -> None:
+    from .browserserver import default_endpoint_file, serve
+
+    endpoint_file = Path(args.endpoint_file) if args.endpoint_file else default_endpoint_file()
+    try:
+        serve(
+            endpoint_file,
+            pool=args.pool,
+            port=args.port,
+            idle_timeout_s=args.idle_timeout,
+        )
+    except RuntimeError as exc:
+        raise SystemExit(f"[error] {exc}")
+    except KeyboardInterrupt:
+        print("[browser-server] 已停止")
+
+
+def _cmd_index(args: Namespace) -> None:
+    from .index import ContentIndex
+
+    posts, _, _ = _load_posts(Path(args.out_dir))
+    index_path = _index_path(args)
+    with ContentIndex(index_path) as index:
+        indexed, failed = index.update(
+            posts, fetch_workers=args.fetch_workers, refresh=args.refresh
+        )
+        total = len(index.indexed_urls())
+    print(f"[index] 新索引 {indexed} 篇，失败 {failed} 篇；索引共 {total} 篇: {index_path}")
+
+
+def _cmd_search(args: Namespace) -> None:
+    from .index import ContentIndex
+
+    index_path = _index_path(args)
+    if not index_path.exists():
+        raise SystemExit(f"[error] 找不到索引 {index_path}，请先运行 index 子命令。")
+
+    keywords = _split_keywords(args.keywords)
+    started = time.perf_counter()
+    with ContentIndex(index_path) as index:
+        hits = index.search(keywords, match=args.match, limit=args.top)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"[search] {', '.join(keywords)} ({args.match}): {len(hits)} 篇，{elapsed_ms:.1f} ms")
+    for rank, hit in enumerate(hits, start=1):
+        print(f"  {rank:>3}. {hit.score:8.3f}  {hit.date}  {hit.title}  {hit.url}")
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = build_parser()
+    args = parser.parse_args(_normalize_argv(sys.argv[1:] if argv is None else argv))
+
+    handlers = {
+        "crawl": _cmd_crawl,
+        "render": _cmd_render,
+        "merge": _cmd_merge,
+        "status": _cmd_status,
+        "build": _cmd_build,
+        "plan": _cmd_plan,
+        "watch": _cmd_watch,
+        "distribute": _cmd_distribute,
+        "worker": _cmd_worker,
+        "browser-server": _cmd_browser_server,
+        "index": _cmd_index,
+        "search": _cmd_search,
+    }
+    handlers[args.command](args)
 
 
 if __name__ == "__main__":
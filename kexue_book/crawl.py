@@ -15,13 +15,13 @@ DATE_PATTERN = re.compile(r"(\d{4}-\d{2}-\d{2})")
 ARCHIVE_ID_PATTERN = re.compile(r"/(\d+)$")
 
 
-def _parse_post(post_element: BeautifulSoup) -> Post:
+def _parse_post(post_element: BeautifulSoup, base_url: str = BASE_CATEGORY_URL) -> Post:
     title_el = post_element.select_one("h2 a")
     if not title_el or not title_el.get("href"):
         raise ValueError("Post node is missing title link")
 
     title = title_el.get_text(strip=True)
-    url = urljoin(BASE_CATEGORY_URL, title_el["href"])
+    url = urljoin(base_url, title_el["href"])
 
     meta_text = post_element.select_one("span.submitted")
     if not meta_text:
@@ -43,30 +43,25 @@ def _find_next_page(soup: BeautifulSoup, current_url: str) -> str | None:
     return urljoin(current_url, next_link["href"])
 
 
-def crawl_posts(start: date, end: date) -> List[Post]:
-    """Crawl the Big-Data category and return posts within [start, end]."""
-
-    posts: List[Post] = []
-    seen_pages: set[str] = set()
+def fetch_category_page(page_url: str) -> tuple[List[Post], str | None]:
+    """Fetch one category page and return its posts plus the next page URL."""
 
-    page_url: str | None = BASE_CATEGORY_URL
-    while page_url and page_url not in seen_pages:
-        response = requests.get(page_url, timeout=20)
-        response.raise_for_status()
+    response = requests.get(page_url, timeout=20)
+    response.raise_for_status()
 
-        soup = BeautifulSoup(response.text, "lxml")
-        seen_pages.add(page_url)
+    soup = BeautifulSoup(response.text, "lxml")
+    posts: List[Post] = []
+    for post_element in soup.select("div.Post"):
+        try:
+            posts.append(_parse_post(post_element, page_url))
+        except ValueError:
+            continue
 
-        for post_element in soup.select("div.Post"):
-            try:
-                post = _parse_post(post_element)
-            except ValueError:
-                continue
+    return posts, _find_next_page(soup, page_url)
 
-            if start <= post.date <= end:
-                posts.append(post)
 
-        page_url = _find_next_page(soup, page_url)
+def sort_posts(posts: List[Post]) -> None:
+    """Sort posts in place by date, oldest first."""
 
     def _sort_key(p: Post) -> tuple[date, int]:
         # Use archive id as tie-breaker so posts on the same date follow publish order.
@@ -75,11 +70,35 @@ def crawl_posts(start: date, end: date) -> List[Post]:
         return (p.date, archive_id)
 
     posts.sort(key=_sort_key)
+
+
+def crawl_posts(
+    start: date, end: date, base_url: str = BASE_CATEGORY_URL
+) -> List[Post]:
+    """Crawl the Big-Data category and return posts within [start, end]."""
+
+    posts: List[Post] = []
+    seen_pages: set[str] = set()
+
+    page_url: str | None = base_url
+    while page_url and page_url not in seen_pages:
+        page_posts, next_url = fetch_category_page(page_url)
+        seen_pages.add(page_url)
+
+        for post in page_posts:
+            if start <= post.date <= end:
+                posts.append(post)
+
+        page_url = next_url
+
+    sort_posts(posts)
     return posts
 
 
-def iter_posts(start: date, end: date) -> Iterable[Post]:
+def iter_posts(
+    start: date, end: date, base_url: str = BASE_CATEGORY_URL
+) -> Iterable[Post]:
     """Yield posts within the given date range in chronological order."""
 
-    for post in crawl_posts(start, end):
+    for post in crawl_posts(start, end, base_url):
         yield post
@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from pathlib import Path
+from threading import Event, Thread
+from typing import Callable, List
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from playwright.sync_api import sync_playwright
+
+from .manifest import write_manifest
+from .assetcache import AssetCache
+from .browserserver import launch_or_attach
+from .chapters import file_signature
+from .profiles import DEFAULT_PROFILE, get_profile, profile_artifact
+from .render import (
+    RenderOptions,
+    make_task,
+    new_render_context,
+    render_task,
+    select_tasks,
+)
+from .schedule import HISTORY_NAME, load_duration_model, update_history
+from .taskqueue import DEFAULT_LEASE_SECONDS, DEFAULT_MAX_ATTEMPTS, TaskQueue
+from .types import Post, RenderRecord, RenderTask
+
+QUEUE_NAME = "render-queue.sqlite"
+POLL_SECONDS = 2.0
+PROGRESS_SECONDS = 10.0
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _upload_chapter(local_path: Path, target: Path) -> None:
+    # Copy to a temp name on the shared filesystem first so the coordinator never
+    # sees a half-written chapter.
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_target = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    try:
+        shutil.copyfile(local_path, tmp_target)
+        os.replace(tmp_target, target)
+    finally:
+        tmp_target.unlink(missing_ok=True)
+
+
+def _heartbeat_loop(
+    queue_path: Path, lease_seconds: float, index: int, worker: str, stop: Event
+) -> None:
+    # sqlite3 connections must not be shared across threads, so the heartbeat
+    # thread opens its own.
+    with TaskQueue(queue_path, lease_seconds=lease_seconds) as queue:
+        while not stop.wait(max(1.0, lease_seconds / 3)):
+            if not queue.heartbeat(index, worker):
+                return
+
+
+def run_worker(
+    queue_path: Path,
+    worker_id: str | None = None,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    idle_timeout: float = 60.0,
+    asset_cache_dir: Path | None = None,
+    browser_server: Path | None = None,
+) -> int:
+    """
+    Claim and render tasks from the queue until it is finished.
+
+    Chapters are rendered to a local temp directory and then uploaded next to the
+    queue. ``asset_cache_dir`` is a cache local to this host, shared by all its
+    workers. ``browser_server`` attaches to a ``browser-server`` on this host
+    instead of launching Chromium. ``idle_timeout`` only runs while no task is
+    leased anywhere, because a lease held by a crashed worker expires back into
+    the queue. Returns the number of tasks this worker completed.
+    """
+    worker = worker_id or default_worker_id()
+    prefix = f"[worker {worker}]"
+    completed = 0
+    idle_since: float | None = None
+    asset_cache = AssetCache(asset_cache_dir) if asset_cache_dir is not None else None
+
+    with TaskQueue(queue_path, lease_seconds=lease_seconds) as queue, \
+            tempfile.TemporaryDirectory(prefix="kexue-worker-") as tmp, \
+            sync_playwright() as p:
+        delay_ms = int(queue.get_meta("delay_ms", "4000"))
+        stream_pdf = queue.get_meta("print_mode", "stream") == "stream"
+        profile = get_profile(queue.get_meta("profile", DEFAULT_PROFILE) or DEFAULT_PROFILE)
+        browser = None
+        context = None
+        attached = False
+
+        while True:
+            task = queue.claim(worker)
+            if task is None:
+                counts = queue.counts()
+                if counts["pending"] + counts["leased"] == 0 and counts["done"] + counts["failed"] > 0:
+                    break
+                # 其他 worker 手上的任务可能因租约过期回到队列，有租约时不算空闲
+                if counts["leased"]:
+                    idle_since = None
+                    time.sleep(POLL_SECONDS)
+                    continue
+                idle_since = idle_since or time.monotonic()
+                if time.monotonic() - idle_since > idle_timeout:
+                    print(f"{prefix} 队列空闲超过 {idle_timeout:.0f}s，退出")
+                    break
+                time.sleep(POLL_SECONDS)
+                continue
+            idle_since = None
+
+            if browser is None or not browser.is_connected():
+                browser, attached = launch_or_attach(p, browser_server, slot=os.getpid())
+                context = new_render_context(browser, asset_cache, profile)
+
+            stop = Event()
+            heartbeat = Thread(
+                target=_heartbeat_loop,
+                args=(queue_path, lease_seconds, task.index, worker, stop),
+                daemon=True,
+            )
+            heartbeat.start()
+            try:
+                local_task = RenderTask(
+                    index=task.index,
+                    post=task.post,
+                    pdf_path=Path(tmp) / task.pdf_path.name,
+                )
+                record = render_task(
+                    context,
+                    local_task,
+                    delay_ms,
+                    completed + 1,
+                    sum(queue.counts().values()),
+                    prefix=prefix,
+                    stream=stream_pdf,
+                    profile=profile,
+                    attached=attached,
+                )
+                if record.status == "success":
+                    _upload_chapter(local_task.pdf_path, task.pdf_path)
+                    local_task.pdf_path.unlink(missing_ok=True)
+                    # 复制不改变大小和哈希，mtime 以共享目录里的文件为准，--resume 才能直接信任
+                    file_size, mtime_ns = file_signature(task.pdf_path) or (None, None)
+                    record = replace(record, file_size=file_size, mtime_ns=mtime_ns)
+                record = replace(record, pdf_path=task.pdf_path, rendered=True)
+            finally:
+                stop.set()
+                heartbeat.join()
+
+            if queue.complete(worker, record):
+                completed += 1
+            else:
+                print(f"{prefix} warn #{task.index:03d} 租约已过期，结果由其他 worker 负责")
+
+        if browser is not None:
+            if browser.is_connected():
+                context.close()
+            browser.close()
+
+    if asset_cache is not None:
+        print(f"{prefix} 资源缓存: {asset_cache.stats.summary()}")
+    return completed
+
+
+def _spawn_local_workers(
+    queue_path: Path,
+    count: int,
+    lease_seconds: float,
+    asset_cache_dir: Path | None = None,
+    browser_server: Path | None = None,
+) -> List[subprocess.Popen]:
+    command = [
+        sys.executable,
+        "-m",
+        "kexue_book.cli",
+        "worker",
+        "--queue",
+        str(queue_path),
+        "--lease-seconds",
+        str(lease_seconds),
+    ]
+    if asset_cache_dir is not None:
+        command += ["--asset-cache", str(asset_cache_dir)]
+    if browser_server is not None:
+        command += ["--browser-server", str(browser_server)]
+    return [subprocess.Popen(command) for _ in range(count)]
+
+
+def coordinate_render(
+    posts: List[Post],
+    out_dir: Path,
+    options: RenderOptions = RenderOptions(),
+    manifest_path: Path | None = None,
+    local_workers: int = 0,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    on_record: Callable[[RenderRecord], None] | None = None,
+) -> list[RenderRecord]:
+    """
+    Enqueue render tasks, wait for workers to drain the queue and return all records.
+
+    ``local_workers`` starts that many ``worker`` processes on this machine; workers
+    on other hosts can attach at any time with ``kexue_book.cli worker --queue``.
+    Workers read the delay, print mode and profile of ``options`` from the queue,
+    so they all render the same way; local workers also get its asset cache and
+    browser server. ``on_record`` receives reused records right away and rendered
+    ones as the coordinator sees them finish in the queue.
+    """
+    profile = options.profile
+    asset_cache_dir = options.asset_cache_dir
+    browser_server = options.browser_server
+    # 调度模型、队列元数据和耗时历史都按实际等待的时长计算
+    delay_ms = profile.effective_delay_ms(options.delay_ms)
+    queue_path = out_dir / QUEUE_NAME
+    chapters_dir = out_dir / profile_artifact("chapters", profile.name)
+    history_path = out_dir / profile_artifact(HISTORY_NAME, profile.name)
+    chapters_dir.mkdir(parents=True, exist_ok=True)
+
+    tasks = [
+        make_task(index, post, chapters_dir)
+        for index, post in enumerate(posts, start=1)
+    ]
+    tasks_to_render, records = select_tasks(
+        tasks,
+        manifest_path,
+        resume=options.resume,
+        retry_failed=options.retry_failed,
+        check_changes=options.check_changes,
+        check_workers=options.check_workers,
+        profile=profile,
+    )
+
+    emitted: set[int] = set()
+
+    def emit(record: RenderRecord) -> None:
+        if on_record is not None and record.index not in emitted:
+            emitted.add(record.index)
+            on_record(replace(record, profile=profile.name))
+
+    for record in records:
+        emit(record)
+
+    # 按历史耗时估算优先级，最长的文章最先被领取
+    model = load_duration_model(
+        out_dir, delay_ms, manifest_path=manifest_path, history_name=history_path.name
+    )
+    priorities = {task.index: model.estimate(task.post).seconds for task in tasks_to_render}
+
+    with TaskQueue(queue_path, lease_seconds=lease_seconds) as queue:
+        queued = queue.reset(
+            tasks_to_render,
+            delay_ms=delay_ms,
+            max_attempts=max_attempts,
+            priorities=priorities,
+            print_mode="stream" if options.stream_pdf else "buffer",
+            profile=profile.name,
+        )
+        print(f"[distribute] 已入队 {queued} 篇，复用 {len(records)} 篇；队列: {queue_path}")
+        if queued:
+            print(
+                f"[distribute] 其他机器可执行: python -m kexue_book.cli worker --queue {queue_path}"
+            )
+
+        processes = (
+            _spawn_local_workers(
+                queue_path, local_workers, lease_seconds, asset_cache_dir, browser_server
+            )
+            if queued
+            else []
+        )
+        respawns_left = local_workers * max_attempts
+        warned_no_workers = False
+        try:
+            last_report = 0.0
+            while not queue.is_finished():
+                queue.reap_expired()
+                # 本机 worker 异常退出（非 0）时补上新的进程；其租约过期后任务会被重新领取。
+                # 正常退出（队列已完成或确实空闲）不占用重启次数
+                for i, process in enumerate(processes):
+                    if process.poll() not in (None, 0) and respawns_left > 0:
+                        print(f"[distribute] warn 本机 worker 退出 (code={process.returncode})，重新启动")
+                        processes[i] = _spawn_local_workers(
+                            queue_path, 1, lease_seconds, asset_cache_dir, browser_server
+                        )[0]
+                        respawns_left -= 1
+                if (
+                    processes
+                    and respawns_left == 0
+                    and not warned_no_workers
+                    and all(process.poll() is not None for process in processes)
+                ):
+                    print("[distribute] warn 本机 worker 已全部退出，只等待其他机器上的 worker")
+                    warned_no_workers = True
+                if on_record is not None:
+                    for record in queue.records():
+                        emit(record)
+                if time.monotonic() - last_report >= PROGRESS_SECONDS:
+                    counts = queue.counts()
+                    print(
+                        f"[distribute] 进度: 完成 {counts['done']}，失败 {counts['failed']}，"
+                        f"渲染中 {counts['leased']}，等待 {counts['pending']}"
+                    )
+                    last_report = time.monotonic()
+                time.sleep(POLL_SECONDS)
+        finally:
+            for process in processes:
+                try:
+                    process.wait(timeout=PROGRESS_SECONDS)
+                except subprocess.TimeoutExpired:
+                    process.terminate()
+
+        records.extend(queue.records())
+    for record in records:
+        emit(record)
+
+    records = sorted(
+        (replace(record, profile=profile.name) for record in records),
+        key=lambda record: record.index,
+    )
+    if manifest_path is not None:
+        write_manifest(manifest_path, records)
+    update_history(history_path, records, delay_ms)
+    return records
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+import html
+import random
+import re
+import struct
+import zlib
+
+CATEGORY_PATH = "/category/Big-Data"
+PAGE_PATH_PATTERN = re.compile(r"^/category/Big-Data(?:/page/(\d+))?/?$")
+ARTICLE_PATH_PATTERN = re.compile(r"^/archives/(\d+)/?$")
+IMAGE_PATH_PATTERN = re.compile(r"^/img/(\d+)-(\d+)\.png$")
+FIRST_ARCHIVE_ID = 10000
+
+# Mimics the site's MathJax behaviour: a status box is shown while loading and
+# the formulas are only typeset after a delay, so renders that print too early
+# produce visibly broken output.
+TYPESET_SCRIPT = """
+<div id="MathJax_Message">Loading [MathJax]/jax/output/CommonHTML/jax.js</div>
+<script>
+window.addEventListener("load", function () {
+  setTimeout(function () {
+    document.querySelectorAll("span.math").forEach(function (el) {
+      var box = document.createElement("mjx-container");
+      box.setAttribute("jax", "CHTML");
+      box.setAttribute("display", "true");
+      box.textContent = el.textContent;
+      var tag = document.createElement("mjx-tag");
+      tag.textContent = "(" + el.dataset.eq + ")";
+      box.appendChild(tag);
+      el.replaceWith(box);
+    });
+    document.getElementById("MathJax_Message").style.display = "none";
+  }, %(typeset_ms)d);
+});
+</script>
+"""
+
+
+@dataclass(frozen=True)
+class FixtureConfig:
+    """Shape of the synthetic site served by :class:`FixtureSite`."""
+
+    posts: int = 40
+    per_page: int = 10
+    paragraphs: int = 12
+    formulas: int = 6
+    images_per_post: int = 1
+    image_kb: int = 64
+    typeset_ms: int = 300
+    first_date: date = date(2015, 1, 1)
+    seed: int = 0
+
+
+def _png_bytes(target_kb: int) -> bytes:
+    """Return a valid grayscale PNG of roughly ``target_kb`` kilobytes."""
+    side = max(1, int((max(target_kb, 1) * 1024) ** 0.5))
+    raw = b"".join(b"\x00" + bytes((x * 7 + y) & 0xFF for x in range(side)) for y in range(side))
+
+    def chunk(kind: bytes, payload: bytes) -> bytes:
+        body = kind + payload
+        return struct.pack(">I", len(payload)) + body + struct.pack(">I", zlib.crc32(body))
+
+    header = struct.pack(">IIBBBBB", side, side, 8, 0, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(raw, 0))
+        + chunk(b"IEND", b"")
+    )
+
+
+class FixtureSite:
+    """
+    Local HTTP server that imitates the Scientific Spaces category and article pages.
+
+    Category pages use the same ``div.Post`` / ``span.submitted`` / ``»`` markup that
+    ``crawl.py`` parses; articles carry a ``.PostContent`` body, delayed MathJax-like
+    typesetting and images of configurable weight. Use as a context manager.
+    """
+
+    def __init__(self, config: FixtureConfig | None = None, port: int = 0) -> None:
+        self.config = config or FixtureConfig()
+        self._image = _png_bytes(self.config.image_kb)
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def category_url(self) -> str:
+        return self.base_url + CATEGORY_PATH
+
+    def post_date(self, number: int) -> date:
+        return self.config.first_date + timedelta(days=number * 3)
+
+    def start(self) -> "FixtureSite":
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "FixtureSite":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _category_page(self, page: int) -> str | None:
+        config = self.config
+        page_count = max(1, -(-config.posts // config.per_page))
+        if page < 1 or page > page_count:
+            return None
+
+        # Newest first, like the real category listing.
+        newest = config.posts - 1 - (page - 1) * config.per_page
+        numbers = range(newest, max(newest - config.per_page, -1), -1)
+        items = []
+        for number in numbers:
+            archive_id = FIRST_ARCHIVE_ID + number
+            items.append(
+                '<div class="Post">'
+                f'<h2><a href="/archives/{archive_id}">Fixture post {number:05d}</a></h2>'
+                f'<span class="submitted">{self.post_date(number).isoformat()} | 苏剑林 | 0 评论</span>'
+                "</div>"
+            )
+
+        pager = ""
+        if page < page_count:
+            pager = f'<div class="pager"><a href="{CATEGORY_PATH}/page/{page + 1}/">»</a></div>'
+        return f"<html><body>{''.join(items)}{pager}</body></html>"
+
+    def _article(self, archive_id: int) -> str | None:
+        config = self.config
+        number = archive_id - FIRST_ARCHIVE_ID
+        if number < 0 or number >= config.posts:
+            return None
+
+        rng = random.Random(config.seed * 1_000_003 + number)
+        # Long math-heavy posts are several times larger than short notes.
+        weight = rng.choice((1, 1, 1, 2, 3, 6))
+        blocks = []
+        for i in range(config.paragraphs * weight):
+            words = " ".join(f"token{rng.randrange(5000)}" for _ in range(60))
+            blocks.append(f"<p>{html.escape(words)} 注意力机制与位置编码的推导。</p>")
+            if config.formulas and i % max(1, config.paragraphs // config.formulas) == 0:
+                blocks.append(
+                    f'<span class="math" data-eq="{i + 1}">'
+                    r"\boldsymbol{q}_m^{\top}\boldsymbol{k}_n = \mathrm{Re}[q_m k_n^* e^{i(m-n)\theta}]"
+                    "</span>"
+                )
+        for k in range(config.images_per_post):
+            blocks.append(f'<p><img src="/img/{archive_id}-{k}.png" alt="figure {k}"></p>')
+
+        return (
+            "<html><head><title>Fixture post</title></head><body>"
+            "<header>Scientific Spaces</header><nav>nav</nav><div id=\"sideBar\">side</div>"
+            f'<h1>Fixture post {number:05d}</h1><div class="PostContent">{"".join(blocks)}</div>'
+            '<div id="comments">comments</div><footer>footer</footer>'
+            + TYPESET_SCRIPT % {"typeset_ms": config.typeset_ms}
+            + "</body></html>"
+        )
+
+    def _make_handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802 - http.server naming
+                path = self.path.split("?", 1)[0]
+
+                match = PAGE_PATH_PATTERN.match(path)
+                if match:
+                    body = site._category_page(int(match.group(1) or 1))
+                    return self._send_html(body)
+
+                match = ARTICLE_PATH_PATTERN.match(path)
+                if match:
+                    return self._send_html(site._article(int(match.group(1))))
+
+                if IMAGE_PATH_PATTERN.match(path):
+                    return self._send(200, "image/png", site._image)
+
+                self._send(404, "text/plain", b"not found")
+
+            def _send_html(self, body: str | None) -> None:
+                if body is None:
+                    self._send(404, "text/plain", b"not found")
+                else:
+                    self._send(200, "text/html; charset=utf-8", body.encode("utf-8"))
+
+            def _send(self, status: int, content_type: str, payload: bytes) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        return Handler
@@ -0,0 +1,110 @@
+"""Detect articles that were edited after their chapter PDF was rendered."""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Iterable, Mapping
+import hashlib
+
+from .index import CONTENT_SELECTOR
+from .types import RenderRecord
+
+DEFAULT_CHECK_WORKERS = 16
+
+
+@dataclass(frozen=True)
+class SourceFingerprint:
+    """What the article looked like when its chapter was rendered."""
+
+    etag: str | None
+    last_modified: str | None
+    content_hash: str | None
+
+
+@dataclass(frozen=True)
+class ChangeCheck:
+    # "unchanged" | "changed" | "baseline"（旧 manifest 没有指纹，本次补记）| "error"
+    status: str
+    fingerprint: SourceFingerprint | None
+    detail: str | None = None
+
+
+def content_hash(html: str) -> str | None:
+    """SHA-256 of the whitespace-normalized ``.PostContent`` markup; None if it is missing."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "lxml")
+    content = soup.select_one(CONTENT_SELECTOR)
+    if content is None:
+        return None
+    for element in content.select("script, style"):
+        element.decompose()
+    normalized = " ".join(str(content).split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def fingerprint_from_response(headers: Mapping[str, str], html: str | None) -> SourceFingerprint:
+    lowered = {name.lower(): value for name, value in headers.items()}
+    return SourceFingerprint(
+        etag=lowered.get("etag"),
+        last_modified=lowered.get("last-modified"),
+        content_hash=content_hash(html) if html is not None else None,
+    )
+
+
+def check_record(record: RenderRecord, timeout: float = 30) -> ChangeCheck:
+    """
+    Compare one reused chapter with the live article.
+
+    Sends a conditional GET when the manifest has an ETag or Last-Modified; a
+    304 means unchanged. Otherwise the ``.PostContent`` hash decides, so pages
+    whose validators change on every request (or that send none) still work.
+    """
+    import requests
+
+    headers: dict[str, str] = {}
+    if record.etag:
+        headers["If-None-Match"] = record.etag
+    if record.last_modified:
+        headers["If-Modified-Since"] = record.last_modified
+
+    try:
+        response = requests.get(record.post.url, headers=headers, timeout=timeout)
+        if response.status_code == 304:
+            return ChangeCheck(
+                "unchanged",
+                SourceFingerprint(record.etag, record.last_modified, record.content_hash),
+            )
+        response.raise_for_status()
+        response.encoding = response.encoding or "utf-8"
+        fingerprint = fingerprint_from_response(response.headers, response.text)
+    except Exception as exc:
+        # render 在模块级导入本模块，这里延迟导入以免循环
+        from .render import format_failure
+
+        return ChangeCheck("error", None, format_failure(exc, limit=200))
+
+    if fingerprint.content_hash is None:
+        return ChangeCheck("error", None, f"页面缺少 {CONTENT_SELECTOR}")
+    if record.content_hash is None:
+        return ChangeCheck("baseline", fingerprint)
+    if fingerprint.content_hash != record.content_hash:
+        return ChangeCheck("changed", fingerprint)
+    return ChangeCheck("unchanged", fingerprint)
+
+
+def check_for_changes(
+    records: Iterable[RenderRecord], workers: int = DEFAULT_CHECK_WORKERS
+) -> dict[int, ChangeCheck]:
+    """Check reused chapters concurrently; returns the result per record index."""
+    records = list(records)
+    results: dict[int, ChangeCheck] = {}
+    if not records:
+        return results
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(records)))) as executor:
+        futures = {executor.submit(check_record, record): record for record in records}
+        for fut in as_completed(futures):
+            results[futures[fut].index] = fut.result()
+    return results
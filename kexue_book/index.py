@@ -0,0 +1,338 @@
+"""Persistent full-text index of article bodies for content-based post selection."""
+
+from __future__ import annotations
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Iterable, List
+import hashlib
+import math
+import re
+import sqlite3
+import time
+import unicodedata
+
+from .types import Post
+
+INDEX_NAME = "content-index.sqlite"
+CONTENT_SELECTOR = ".PostContent"
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Words/numbers in any script (Latin, Greek, ...) and runs of CJK ideographs;
+# words are matched whole, like a search engine would. CJK text has no word
+# boundaries, so runs are indexed as overlapping bigrams (single characters stay
+# unigrams); a query phrase matches when all of its bigrams are present and the
+# phrase itself occurs in the stored text. Documents also store every CJK
+# character as a unigram so that one-character queries are a plain lookup.
+_CJK_RANGES = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+TOKEN_PATTERN = re.compile(rf"[{_CJK_RANGES}]+|[^\W_{_CJK_RANGES}]+")
+CJK_PATTERN = re.compile(rf"[{_CJK_RANGES}]")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    date TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    text TEXT NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    doc_id INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);
+"""
+
+
+def normalize_text(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into index terms: casefolded words and CJK bigrams."""
+    terms: List[str] = []
+    for run in TOKEN_PATTERN.findall(normalize_text(text)):
+        if CJK_PATTERN.match(run):
+            if len(run) == 1:
+                terms.append(run)
+            else:
+                terms.extend(run[i : i + 2] for i in range(len(run) - 1))
+        else:
+            terms.append(run)
+    return terms
+
+
+def _char_terms(text: str) -> List[str]:
+    # 单字 run 已经作为 unigram 出现在 tokenize 的结果里
+    return [
+        char
+        for run in TOKEN_PATTERN.findall(normalize_text(text))
+        if len(run) > 1 and CJK_PATTERN.match(run)
+        for char in run
+    ]
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    url: str
+    title: str
+    date: date
+    score: float
+
+
+def extract_post_text(html: str) -> str:
+    """Return the visible text of the article body (``.PostContent``)."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "lxml")
+    content = soup.select_one(CONTENT_SELECTOR)
+    if content is None:
+        raise ValueError(f"页面缺少 {CONTENT_SELECTOR}")
+    for element in content.select("script, style"):
+        element.decompose()
+    return " ".join(content.get_text(" ").split())
+
+
+def _fetch_post_text(url: str) -> str:
+    import requests
+
+    response = requests.get(url, timeout=30)
+    response.raise_for_status()
+    response.encoding = response.encoding or "utf-8"
+    return extract_post_text(response.text)
+
+
+class ContentIndex:
+    """
+    Inverted index over article bodies, stored in one SQLite file.
+
+    Each article is fetched once; :meth:`update` only fetches URLs that are not
+    yet indexed (or all of them with ``refresh=True``) and skips rewriting the
+    postings when the body text is unchanged.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path))
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "ContentIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def indexed_urls(self) -> set[str]:
+        return {row[0] for row in self._conn.execute("SELECT url FROM docs")}
+
+    def text_lengths(self) -> dict[str, int]:
+        """Body text length in characters per indexed URL (a size hint for scheduling)."""
+        return dict(self._conn.execute("SELECT url, LENGTH(text) FROM docs"))
+
+    def add(self, post: Post, text: str) -> bool:
+        """Index (or re-index) one article; returns False if the text was unchanged."""
+        content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        row = self._conn.execute(
+            "SELECT id, content_hash FROM docs WHERE url = ?", (post.url,)
+        ).fetchone()
+        if row is not None and row[1] == content_hash:
+            return False
+
+        counts = Counter(tokenize(text))
+        length = sum(counts.values())
+        counts.update(_char_terms(text))
+        with self._conn:
+            if row is not None:
+                doc_id = row[0]
+                self._conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+                self._conn.execute(
+                    "UPDATE docs SET title = ?, date = ?, length = ?, content_hash = ?, "
+                    "text = ?, indexed_at = ? WHERE id = ?",
+                    (
+                        post.title,
+                        post.date.isoformat(),
+                        length,
+                        content_hash,
+                        text,
+                        time.time(),
+                        doc_id,
+                    ),
+                )
+            else:
+                cursor = self._conn.execute(
+                    "INSERT INTO docs (url, title, date, length, content_hash, text, indexed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        post.url,
+                        post.title,
+                        post.date.isoformat(),
+                        length,
+                        content_hash,
+                        text,
+                        time.time(),
+                    ),
+                )
+                doc_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)",
+                [(term, doc_id, tf) for term, tf in counts.items()],
+            )
+        return True
+
+    def update(
+        self, posts: Iterable[Post], fetch_workers: int = 8, refresh: bool = False
+    ) -> tuple[int, int]:
+        """
+        Fetch and index posts that are missing from the index.
+
+        Returns ``(indexed, failed)``. Fetching runs in a thread pool; all writes
+        happen on the calling thread.
+        """
+        known = set() if refresh else self.indexed_urls()
+        todo = [post for post in posts if post.url not in known]
+        if not todo:
+            return 0, 0
+
+        print(f"[index] 需要抓取正文 {len(todo)} 篇")
+        indexed = failed = 0
+        with ThreadPoolExecutor(max_workers=max(1, fetch_workers)) as executor:
+            futures = {executor.submit(_fetch_post_text, post.url): post for post in todo}
+            for fut in as_completed(futures):
+                post = futures[fut]
+                try:
+                    text = fut.result()
+                except Exception as exc:
+                    failed += 1
+                    print(f"[index] warn 正文抓取失败，跳过: {post.url} ({exc})")
+                    continue
+                self.add(post, text)
+                indexed += 1
+        return indexed, failed
+
+    def _doc_stats(self) -> tuple[int, float]:
+        count, avg_length = self._conn.execute(
+            "SELECT COUNT(*), AVG(length) FROM docs"
+        ).fetchone()
+        return count, avg_length or 0.0
+
+    def _substring_scores(self, keyword: str, case_sensitive: bool) -> dict[int, float]:
+        # 关键词里没有可索引的词（只有符号等），退回逐篇扫描正文，按出现次数打分
+        needle = (keyword if case_sensitive else normalize_text(keyword)).strip()
+        if not needle:
+            return {}
+        print(f"[index] warn 关键词 {keyword!r} 无法使用索引，改为逐篇扫描正文")
+        scores: dict[int, float] = {}
+        for doc_id, text in self._conn.execute("SELECT id, text FROM docs"):
+            haystack = text if case_sensitive else normalize_text(text)
+            occurrences = haystack.count(needle)
+            if occurrences:
+                scores[doc_id] = float(occurrences)
+        return scores
+
+    def _keyword_scores(
+        self, keyword: str, doc_count: int, avg_length: float, case_sensitive: bool
+    ) -> dict[int, float]:
+        terms = sorted(set(tokenize(keyword)))
+        if not terms:
+            return self._substring_scores(keyword, case_sensitive)
+
+        placeholders = ",".join("?" for _ in terms)
+        rows = self._conn.execute(
+            "SELECT p.term, p.doc_id, p.tf, d.length FROM postings p "
+            f"JOIN docs d ON d.id = p.doc_id WHERE p.term IN ({placeholders})",
+            terms,
+        ).fetchall()
+
+        by_term: dict[str, list[tuple[int, int, int]]] = {}
+        for term, doc_id, tf, length in rows:
+            by_term.setdefault(term, []).append((doc_id, tf, length))
+        if len(by_term) < len(terms):
+            return {}
+
+        candidates = set.intersection(
+            *({doc_id for doc_id, _, _ in postings} for postings in by_term.values())
+        )
+        scores: dict[int, float] = dict.fromkeys(candidates, 0.0)
+        for postings in by_term.values():
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf, length in postings:
+                if doc_id not in scores:
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / (avg_length or 1))
+                scores[doc_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        # Terms only prove the bigrams/words occur somewhere; confirm the phrase.
+        # A keyword that is exactly one term is already proven by its postings,
+        # so only multi-term or case-sensitive keywords rescan the stored text.
+        needle = keyword if case_sensitive else normalize_text(keyword)
+        if candidates and (case_sensitive or terms != [needle.strip()]):
+            placeholders = ",".join("?" for _ in candidates)
+            for doc_id, text in self._conn.execute(
+                f"SELECT id, text FROM docs WHERE id IN ({placeholders})",
+                list(candidates),
+            ):
+                haystack = text if case_sensitive else normalize_text(text)
+                if needle not in haystack:
+                    del scores[doc_id]
+        return scores
+
+    def search(
+        self,
+        keywords: List[str],
+        match: str = "any",
+        case_sensitive: bool = False,
+        limit: int | None = None,
+    ) -> List[SearchHit]:
+        """Return posts whose body contains the keywords, best BM25 score first."""
+        doc_count, avg_length = self._doc_stats()
+        per_keyword = [
+            self._keyword_scores(keyword, doc_count, avg_length, case_sensitive)
+            for keyword in keywords
+        ]
+        if not per_keyword:
+            return []
+
+        if match == "all":
+            doc_ids = set.intersection(*(set(scores) for scores in per_keyword))
+        else:
+            doc_ids = set().union(*(set(scores) for scores in per_keyword))
+        totals = {
+            doc_id: sum(scores.get(doc_id, 0.0) for scores in per_keyword)
+            for doc_id in doc_ids
+        }
+        ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+        if limit is not None:
+            ranked = ranked[:limit]
+        if not ranked:
+            return []
+
+        placeholders = ",".join("?" for _ in ranked)
+        docs = {
+            doc_id: (url, title, post_date)
+            for doc_id, url, title, post_date in self._conn.execute(
+                f"SELECT id, url, title, date FROM docs WHERE id IN ({placeholders})",
+                [doc_id for doc_id, _ in ranked],
+            )
+        }
+        return [
+            SearchHit(
+                url=docs[doc_id][0],
+                title=docs[doc_id][1],
+                date=date.fromisoformat(docs[doc_id][2]),
+                score=round(score, 4),
+            )
+            for doc_id, score in ranked
+        ]
@@ -0,0 +1,183 @@
+"""Persisted artifacts shared by the CLI stages: the post list and the render manifest."""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any
+import json
+
+from .types import Post, RenderRecord
+
+MANIFEST_SCHEMA_VERSION = 2
+POST_LIST_SCHEMA_VERSION = 1
+
+
+def resolve_manifest_pdf_path(entry: dict[str, Any], manifest_dir: Path) -> Path | None:
+    pdf_path = entry.get("pdf_path")
+    if not isinstance(pdf_path, str) or not pdf_path:
+        return None
+
+    path = Path(pdf_path)
+    return path if path.is_absolute() else manifest_dir / path
+
+
+def _display_pdf_path(path: Path, manifest_dir: Path) -> str:
+    try:
+        return str(path.resolve(strict=False).relative_to(manifest_dir.resolve()))
+    except ValueError:
+        return str(path)
+
+
+def _record_to_manifest_entry(
+    record: RenderRecord, manifest_dir: Path
+) -> dict[str, Any]:
+    return {
+        "index": record.index,
+        "title": record.post.title,
+        "url": record.post.url,
+        "date": record.post.date.isoformat(),
+        "pdf_path": _display_pdf_path(record.pdf_path, manifest_dir),
+        "status": record.status,
+        "failure_reason": record.failure_reason,
+        "page_count": record.page_count,
+        "rendered": record.rendered,
+        "file_size": record.file_size,
+        "mtime_ns": record.mtime_ns,
+        "sha256": record.sha256,
+        "render_seconds": record.render_seconds,
+        "etag": record.etag,
+        "last_modified": record.last_modified,
+        "content_hash": record.content_hash,
+        "worker_peak_rss": record.worker_peak_rss,
+        "browser_peak_rss": record.browser_peak_rss,
+        "profile": record.profile,
+    }
+
+
+def _post_from_dict(data: dict[str, Any]) -> Post:
+    return Post(
+        title=str(data["title"]),
+        url=str(data["url"]),
+        date=date.fromisoformat(str(data["date"])),
+    )
+
+
+def _post_to_dict(post: Post) -> dict[str, Any]:
+    return {"title": post.title, "url": post.url, "date": post.date.isoformat()}
+
+
+def write_json(path: Path, data: dict[str, Any]) -> None:
+    """Write ``data`` as indented UTF-8 JSON, creating the parent directory."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+def source_fingerprint(entry: dict[str, Any]) -> dict[str, str | None]:
+    """The article validators stored with a manifest entry, as RenderRecord fields."""
+    return {
+        key: entry.get(key) if isinstance(entry.get(key), str) else None
+        for key in ("etag", "last_modified", "content_hash")
+    }
+
+
+def load_manifest_entries(manifest_path: Path) -> list[dict[str, Any]]:
+    with manifest_path.open("r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    entries = data.get("entries")
+    if not isinstance(entries, list):
+        raise ValueError(f"manifest 缺少 entries 列表: {manifest_path}")
+
+    return [entry for entry in entries if isinstance(entry, dict)]
+
+
+def load_manifest_records(manifest_path: Path) -> list[RenderRecord]:
+    """Rebuild render records from a manifest written by :func:`write_manifest`."""
+    manifest_dir = manifest_path.parent
+    records: list[RenderRecord] = []
+    for entry in load_manifest_entries(manifest_path):
+        pdf_path = resolve_manifest_pdf_path(entry, manifest_dir)
+        if pdf_path is None:
+            continue
+        page_count = entry.get("page_count")
+        file_size = entry.get("file_size")
+        mtime_ns = entry.get("mtime_ns")
+        sha256 = entry.get("sha256")
+        render_seconds = entry.get("render_seconds")
+        worker_peak_rss = entry.get("worker_peak_rss")
+        browser_peak_rss = entry.get("browser_peak_rss")
+        profile = entry.get("profile")
+        records.append(
+            RenderRecord(
+                index=int(entry["index"]),
+                post=_post_from_dict(entry),
+                pdf_path=pdf_path,
+                status=str(entry.get("status")),
+                failure_reason=entry.get("failure_reason"),
+                page_count=page_count if isinstance(page_count, int) else None,
+                rendered=bool(entry.get("rendered")),
+                file_size=file_size if isinstance(file_size, int) else None,
+                mtime_ns=mtime_ns if isinstance(mtime_ns, int) else None,
+                sha256=sha256 if isinstance(sha256, str) else None,
+                render_seconds=(
+                    float(render_seconds) if isinstance(render_seconds, (int, float)) else None
+                ),
+                **source_fingerprint(entry),
+                worker_peak_rss=worker_peak_rss if isinstance(worker_peak_rss, int) else None,
+                browser_peak_rss=browser_peak_rss if isinstance(browser_peak_rss, int) else None,
+                profile=profile if isinstance(profile, str) else None,
+            )
+        )
+    records.sort(key=lambda record: record.index)
+    return records
+
+
+def write_manifest(manifest_path: Path, records: list[RenderRecord]) -> None:
+    manifest_dir = manifest_path.parent
+    sorted_records = sorted(records, key=lambda record: record.index)
+    write_json(
+        manifest_path,
+        {
+            "schema_version": MANIFEST_SCHEMA_VERSION,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "entries": [
+                _record_to_manifest_entry(record, manifest_dir)
+                for record in sorted_records
+            ],
+        },
+    )
+
+
+def save_post_list(
+    path: Path, posts: list[Post], start: date, end: date
+) -> None:
+    """Persist the crawled (and filtered) post list for the later stages."""
+    write_json(
+        path,
+        {
+            "schema_version": POST_LIST_SCHEMA_VERSION,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "posts": [_post_to_dict(post) for post in posts],
+        },
+    )
+
+
+def load_post_list(path: Path) -> tuple[list[Post], date, date]:
+    """Return ``(posts, start, end)`` from a file written by :func:`save_post_list`."""
+    with path.open("r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    posts = data.get("posts")
+    if not isinstance(posts, list):
+        raise ValueError(f"文章列表缺少 posts: {path}")
+
+    return (
+        [_post_from_dict(item) for item in posts if isinstance(item, dict)],
+        date.fromisoformat(data["start"]),
+        date.fromisoformat(data["end"]),
+    )
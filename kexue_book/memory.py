@@ -0,0 +1,107 @@
+"""Per-article peak memory of a render worker and its browser processes (Linux ``/proc``)."""
+
+from __future__ import annotations
+
+from pathlib import Path
+import os
+
+PROC = Path("/proc")
+
+
+def _status_bytes(pid: int, field: str) -> int | None:
+    """A ``kB`` field of ``/proc/<pid>/status`` in bytes; None if unavailable."""
+    try:
+        with (PROC / str(pid) / "status").open("r", encoding="ascii", errors="replace") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        return None
+    return None
+
+
+def _peak_rss(pid: int) -> int | None:
+    """VmHWM (peak resident set size) of ``pid`` in bytes; None if unavailable."""
+    return _status_bytes(pid, "VmHWM")
+
+
+def _reset_peak(pid: int) -> None:
+    # 写入 5 会把 VmHWM 重置为当前 RSS（Linux 4.0+）；没有权限时保留进程生命周期内的峰值
+    try:
+        (PROC / str(pid) / "clear_refs").write_text("5")
+    except OSError:
+        pass
+
+
+def descendant_pids(root: int) -> list[int]:
+    """All live descendants of ``root`` (Playwright driver and Chromium processes)."""
+    children: dict[int, list[int]] = {}
+    try:
+        entries = list(PROC.iterdir())
+    except OSError:
+        return []
+    for entry in entries:
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue
+        # comm 可能包含空格和括号，ppid 在最后一个 ")" 之后的第二个字段
+        fields = stat[stat.rfind(")") + 2 :].split()
+        if len(fields) > 1:
+            children.setdefault(int(fields[1]), []).append(int(entry.name))
+
+    found: list[int] = []
+    stack = list(children.get(root, []))
+    while stack:
+        pid = stack.pop()
+        found.append(pid)
+        stack.extend(children.get(pid, []))
+    return found
+
+
+def tree_rss(root: int) -> int | None:
+    """
+    Current RSS of ``root`` plus all its descendants in bytes; None without ``/proc``.
+
+    Pages shared between processes (Chromium's) are counted once per process, so
+    this is an upper bound of the real footprint.
+    """
+    if not PROC.is_dir():
+        return None
+    sizes = [_status_bytes(pid, "VmRSS") for pid in [root, *descendant_pids(root)]]
+    return sum(size for size in sizes if size is not None)
+
+
+class PeakMemoryProbe:
+    """
+    Measure peak RSS across one article: the worker itself and the largest of its
+    descendant processes (the Playwright driver and Chromium's browser, renderer
+    and GPU processes). Reports None on platforms without ``/proc``.
+
+    With ``measure_browser=False`` (Chromium belongs to a ``browser-server`` and
+    the only descendant is the Playwright driver) the browser peak is None.
+    """
+
+    def __init__(self, measure_browser: bool = True) -> None:
+        self.enabled = PROC.is_dir()
+        self.measure_browser = measure_browser
+        self.pid = os.getpid()
+
+    def start(self) -> None:
+        if not self.enabled:
+            return
+        _reset_peak(self.pid)
+        if self.measure_browser:
+            for pid in descendant_pids(self.pid):
+                _reset_peak(pid)
+
+    def stop(self) -> tuple[int | None, int | None]:
+        """Return ``(worker_peak_rss, browser_peak_rss)`` in bytes."""
+        if not self.enabled:
+            return None, None
+        if not self.measure_browser:
+            return _peak_rss(self.pid), None
+        peaks = [peak for peak in map(_peak_rss, descendant_pids(self.pid)) if peak is not None]
+        return _peak_rss(self.pid), max(peaks) if peaks else None
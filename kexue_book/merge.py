@@ -1,8 +1,13 @@
 from __future__ import annotations
 
+from collections import deque
+from dataclasses import replace
 from pathlib import Path
+from threading import Thread
 from typing import Iterable
 import io
+import os
+import queue
 
 from pypdf import PdfReader, PdfWriter
 from reportlab.lib.pagesizes import A4
@@ -11,23 +16,31 @@ from reportlab.pdfgen import canvas
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.cidfonts import UnicodeCIDFont
 
-from .types import Post
+from .types import Post, RenderRecord
 
-# 注册内置中文字体，避免封面中文字符变成方块
-pdfmetrics.registerFont(UnicodeCIDFont("STSong-Light"))
+COVER_FONT = "STSong-Light"
+# 乱序到达、尚不能写入书中的章节最多在内存里保留这么多 PDF 字节，超出的改为之后从磁盘读取
+REORDER_BUFFER_MB = 256
+
+
+def _ensure_cover_font() -> None:
+    # 注册内置中文字体，避免封面中文字符变成方块；只在真正绘制封面时注册
+    if COVER_FONT not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(UnicodeCIDFont(COVER_FONT))
 
 
 def _make_cover_pdf(title: str) -> io.BytesIO:
     """Return a single-page cover PDF in memory."""
+    _ensure_cover_font()
     buf = io.BytesIO()
     c = canvas.Canvas(buf, pagesize=A4)
     width, height = A4
 
     c.setTitle(title)
-    c.setFont("STSong-Light", 32)
+    c.setFont(COVER_FONT, 32)
     c.drawCentredString(width / 2.0, height * 0.55, title)
 
-    c.setFont("STSong-Light", 14)
+    c.setFont(COVER_FONT, 14)
     c.drawCentredString(width / 2.0, height * 0.48, "Scientific Spaces Big-Data")
 
     c.showPage()
@@ -36,13 +49,13 @@ def _make_cover_pdf(title: str) -> io.BytesIO:
     return buf
 
 
-def _make_page_number_overlay(num_pages: int) -> io.BytesIO:
-    """Return an in-memory PDF with centered footer page numbers 1..N."""
+def _make_page_number_overlay(num_pages: int, first: int = 1) -> io.BytesIO:
+    """Return an in-memory PDF with centered footer page numbers first..first+N-1."""
     buf = io.BytesIO()
     c = canvas.Canvas(buf, pagesize=A4)
     width, _ = A4
 
-    for i in range(1, num_pages + 1):
+    for i in range(first, first + num_pages):
         c.setFont("Helvetica", 9)
         c.drawCentredString(width / 2.0, 12 * mm, str(i))
         c.showPage()
@@ -52,23 +65,51 @@ def _make_page_number_overlay(num_pages: int) -> io.BytesIO:
     return buf
 
 
+def _open_pdf(source: Path | bytes) -> PdfReader:
+    if isinstance(source, (bytes, bytearray)):
+        return PdfReader(io.BytesIO(source))
+    return PdfReader(str(source))
+
+
+def _write_atomically(writer: PdfWriter, output_path: Path) -> None:
+    # 先写临时文件再原子替换，读者（或 watch 模式的同步工具）不会看到写了一半的书
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+    try:
+        with tmp_path.open("wb") as f:
+            writer.write(f)
+        os.replace(tmp_path, output_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
 def merge_pdfs(
-    pdf_paths: Iterable[Path],
+    pdf_paths: Iterable[Path | bytes],
     posts: Iterable[Post],
     output_path: Path,
     add_bookmarks: bool = True,
     add_cover: bool = False,
     add_page_numbers: bool = False,
     cover_title: str = "苏剑林选集",
+    page_counts: Iterable[int | None] | None = None,
 ) -> Path:
     """
     Merge single-article PDFs into one book with optional cover, bookmarks, and page numbers.
+
+    Each chapter may be given as a path or as the PDF bytes already held in memory.
+
+    ``page_counts`` are the counts recorded when the chapters were validated; a
+    chapter whose page count no longer matches was changed after validation and
+    is reported.
     """
     posts = list(posts)
     pdf_paths = list(pdf_paths)
+    expected_counts = (
+        list(page_counts) if page_counts is not None else [None] * len(pdf_paths)
+    )
 
-    if len(posts) != len(pdf_paths):
-        raise ValueError("pdf_paths 和 posts 数量必须一致")
+    if len(posts) != len(pdf_paths) or len(expected_counts) != len(pdf_paths):
+        raise ValueError("pdf_paths、posts 和 page_counts 数量必须一致")
 
     writer = PdfWriter()
 
@@ -82,9 +123,13 @@ def merge_pdfs(
 
     # Merge article PDFs and add bookmarks with proper offset
     current_page = cover_page_count
-    for pdf_path, post in zip(pdf_paths, posts):
-        reader = PdfReader(str(pdf_path))
+    for pdf_path, post, expected in zip(pdf_paths, posts, expected_counts):
+        reader = _open_pdf(pdf_path)
         num_pages = len(reader.pages)
+        if expected is not None and expected != num_pages:
+            print(
+                f"[merge] warn 章节页数与 manifest 不一致 ({expected} -> {num_pages}): {post.url}"
+            )
 
         for page in reader.pages:
             writer.add_page(page)
@@ -105,8 +150,146 @@ def merge_pdfs(
             overlay_page = overlay_reader.pages[i]
             base_page.merge_page(overlay_page)
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    with output_path.open("wb") as f:
-        writer.write(f)
-
+    _write_atomically(writer, output_path)
     return output_path
+
+
+class OrderedBookWriter:
+    """
+    Build the book while chapters are still being rendered.
+
+    Records may arrive in any order (longest-first scheduling, parallel or
+    remote workers). :meth:`add` hands them to a background thread that appends
+    a chapter as soon as every earlier index has arrived, adding its bookmark
+    and page numbers on the way; failed records only advance the cursor.
+    Records that arrive early wait in a reorder buffer, where in-memory PDF
+    bytes beyond ``buffer_max_mb`` are dropped and read from disk when their
+    turn comes. :meth:`finish` appends whatever is left and writes the file,
+    so only the final serialization happens after the last chapter.
+    """
+
+    def __init__(
+        self,
+        output_path: Path,
+        indices: Iterable[int],
+        add_bookmarks: bool = True,
+        add_cover: bool = False,
+        add_page_numbers: bool = False,
+        cover_title: str = "苏剑林选集",
+        buffer_max_mb: int = REORDER_BUFFER_MB,
+    ) -> None:
+        self.output_path = output_path
+        self.add_bookmarks = add_bookmarks
+        self.add_page_numbers = add_page_numbers
+        self.chapters = 0
+        self.max_buffered = 0
+        self._expected: deque[int] = deque(sorted(set(indices)))
+        self._buffer: dict[int, RenderRecord] = {}
+        self._buffered_bytes = 0
+        self._buffer_budget = buffer_max_mb * 1024 * 1024
+        self._seen: set[int] = set()
+        self._inbox: queue.Queue[RenderRecord | None] = queue.Queue()
+        self._error: BaseException | None = None
+        self._writer = PdfWriter()
+
+        if add_cover:
+            for page in PdfReader(_make_cover_pdf(cover_title)).pages:
+                self._writer.add_page(page)
+            self._stamp_page_numbers(0, len(self._writer.pages))
+
+        self._thread = Thread(target=self._run, name="book-writer", daemon=True)
+        self._thread.start()
+
+    def add(self, record: RenderRecord) -> None:
+        """Queue a finished record; safe to call from any thread, never blocks."""
+        self._inbox.put(record)
+
+    def finish(self, records: Iterable[RenderRecord] = ()) -> Path:
+        """
+        Append the remaining chapters and write the book atomically.
+
+        ``records`` are the final records of the run; any that never went
+        through :meth:`add` are appended now, so the book is complete even if a
+        callback was missed.
+        """
+        for record in records:
+            self.add(record)
+        self._stop()
+        if self._error is not None:
+            raise self._error
+
+        skipped = [index for index in self._expected if index not in self._buffer]
+        if skipped:
+            print(f"[merge] warn {len(skipped)} 篇没有渲染结果，书中跳过")
+        while self._expected:
+            record = self._buffer.pop(self._expected.popleft(), None)
+            if record is not None and record.status == "success":
+                self._append(record)
+
+        _write_atomically(self._writer, self.output_path)
+        return self.output_path
+
+    def abort(self) -> None:
+        """Stop the writer thread without writing the book."""
+        self._stop()
+
+    def _stop(self) -> None:
+        if self._thread.is_alive():
+            self._inbox.put(None)
+            self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            record = self._inbox.get()
+            if record is None:
+                return
+            if self._error is not None:
+                continue
+            try:
+                self._accept(record)
+            except Exception as exc:
+                # 在 finish() 中重新抛出，渲染继续进行
+                self._error = exc
+
+    def _accept(self, record: RenderRecord) -> None:
+        if record.index in self._seen:
+            return
+        self._seen.add(record.index)
+        if record.pdf_data is not None:
+            if self._buffered_bytes + len(record.pdf_data) > self._buffer_budget:
+                record = replace(record, pdf_data=None)
+            else:
+                self._buffered_bytes += len(record.pdf_data)
+        self._buffer[record.index] = record
+        self.max_buffered = max(self.max_buffered, len(self._buffer))
+
+        while self._expected and self._expected[0] in self._buffer:
+            ready = self._buffer.pop(self._expected.popleft())
+            if ready.pdf_data is not None:
+                self._buffered_bytes -= len(ready.pdf_data)
+            if ready.status == "success":
+                self._append(ready)
+
+    def _append(self, record: RenderRecord) -> None:
+        reader = _open_pdf(record.pdf_source)
+        num_pages = len(reader.pages)
+        if record.page_count is not None and record.page_count != num_pages:
+            print(
+                f"[merge] warn 章节页数与 manifest 不一致 ({record.page_count} -> {num_pages}): "
+                f"{record.post.url}"
+            )
+
+        start = len(self._writer.pages)
+        for page in reader.pages:
+            self._writer.add_page(page)
+        self._stamp_page_numbers(start, num_pages)
+        if self.add_bookmarks and num_pages > 0:
+            self._writer.add_outline_item(record.post.title, start)
+        self.chapters += 1
+
+    def _stamp_page_numbers(self, start: int, count: int) -> None:
+        if not self.add_page_numbers or count == 0:
+            return
+        overlay_reader = PdfReader(_make_page_number_overlay(count, first=start + 1))
+        for offset, overlay_page in enumerate(overlay_reader.pages):
+            self._writer.pages[start + offset].merge_page(overlay_page)
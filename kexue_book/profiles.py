@@ -0,0 +1,90 @@
+"""Named render profiles: how much fidelity a chapter PDF is rendered with."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable
+
+from .types import RenderRecord
+
+DEFAULT_PROFILE = "standard"
+
+
+@dataclass(frozen=True)
+class RenderProfile:
+    name: str
+    description: str
+    print_background: bool = True
+    # False: abort image requests, data: URIs inside the page still show
+    load_images: bool = True
+    # Upper bound for --delay-ms; None keeps the requested delay
+    max_delay_ms: int | None = None
+    # Single navigation attempt with this timeout instead of the 75s/90s/120s retries
+    navigation_timeout_ms: int | None = None
+    # Wait for MathJax, web fonts and (eagerly loaded) images before printing
+    wait_for_assets: bool = False
+
+    def effective_delay_ms(self, delay_ms: int) -> int:
+        """The delay actually waited before printing, also what the history records."""
+        if self.max_delay_ms is None:
+            return delay_ms
+        return min(delay_ms, self.max_delay_ms)
+
+
+PROFILES: dict[str, RenderProfile] = {
+    profile.name: profile
+    for profile in (
+        RenderProfile(
+            "draft",
+            "layout preview: no backgrounds or remote images, short waits",
+            print_background=False,
+            load_images=False,
+            max_delay_ms=800,
+            navigation_timeout_ms=30_000,
+        ),
+        RenderProfile("standard", "the default book quality"),
+        RenderProfile(
+            "archival",
+            "standard plus waiting for MathJax, fonts and every image to finish",
+            wait_for_assets=True,
+        ),
+    )
+}
+STANDARD_PROFILE = PROFILES[DEFAULT_PROFILE]
+
+
+def get_profile(name: str) -> RenderProfile:
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"未知的渲染配置: {name}（可选: {', '.join(PROFILES)}）") from None
+
+
+def profile_artifact(name: str, profile: str) -> str:
+    """
+    Per-profile name of an artifact in the output directory.
+
+    ``standard`` keeps the historical names (``chapters``, ``manifest.json``) so
+    existing output directories stay valid; other profiles get a suffix, e.g.
+    ``chapters-draft`` and ``manifest-draft.json``.
+    """
+    if profile == DEFAULT_PROFILE:
+        return name
+    stem, dot, suffix = name.rpartition(".")
+    if not dot:
+        return f"{name}-{profile}"
+    return f"{stem}-{profile}.{suffix}"
+
+
+def record_profile(record: RenderRecord) -> str:
+    # profile 字段出现之前写的 manifest 都是标准质量
+    return record.profile or DEFAULT_PROFILE
+
+
+def mismatched_records(records: Iterable[RenderRecord], profile: str) -> list[RenderRecord]:
+    """Successful records rendered with a profile other than ``profile``."""
+    return [
+        record
+        for record in records
+        if record.status == "success" and record_profile(record) != profile
+    ]
@@ -1,19 +1,51 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from datetime import datetime, timezone
-import json
-import math
+from collections import deque
+from dataclasses import dataclass, replace
+import base64
+import multiprocessing
 import os
+import queue
 import re
+import time
 from pathlib import Path
-from typing import Any, Iterable, List
-from concurrent.futures import ProcessPoolExecutor, as_completed
-
-from playwright.sync_api import Error as PlaywrightError, Page, sync_playwright
-from pypdf import PdfReader
-
-from .types import Post
+from typing import Any, Callable, Iterable, List
+
+from playwright.sync_api import Error as PlaywrightError, Page, Response, sync_playwright
+
+from .assetcache import AssetCache, AssetCacheStats
+from .browserserver import launch_or_attach
+from .chapters import (
+    ChapterInfo,
+    file_signature,
+    find_valid_chapters,
+    inspect_chapter,
+    inspect_pdf_bytes,
+    store_chapter,
+)
+from .freshness import (
+    DEFAULT_CHECK_WORKERS,
+    SourceFingerprint,
+    check_for_changes,
+    fingerprint_from_response,
+)
+from .manifest import (
+    load_manifest_entries,
+    resolve_manifest_pdf_path,
+    source_fingerprint,
+    write_manifest,
+)
+from .memory import PeakMemoryProbe
+from .profiles import STANDARD_PROFILE, RenderProfile, profile_artifact
+from .schedule import (
+    HISTORY_NAME,
+    format_duration,
+    load_duration_model,
+    longest_first,
+    simulate_makespan,
+    update_history,
+)
+from .types import Post, RenderOutput, RenderRecord, RenderTask
 
 PRINT_CSS = """
 header, nav, footer, #sideBar, .MobileSideBar, .post-footer, #comments, .comments, .post-meta {
@@ -85,37 +117,63 @@ PDF_MARGINS = {
     "right": f"{RIGHT_MARGIN_MM}mm",
 }
 PDF_SCALE = 0.9
-MANIFEST_SCHEMA_VERSION = 1
-
-
-@dataclass(frozen=True)
-class RenderTask:
-    index: int
-    post: Post
-    pdf_path: Path
-
+# A4 in inches, as Playwright's page.pdf(format="A4") sends it to Chromium.
+A4_PAPER_INCHES = (8.27, 11.7)
+STREAM_CHUNK_BYTES = 1024 * 1024
+# archival 配置等待 MathJax、字体和图片的上限
+ASSET_WAIT_MS = 30_000
+
+# 把懒加载图片改为立即加载，然后等待 MathJax 排版、Web 字体和所有图片完成；
+# 超时返回 false，不抛异常
+WAIT_FOR_ASSETS_JS = """
+async (timeoutMs) => {
+  for (const img of document.images) {
+    if (img.loading === "lazy") img.loading = "eager";
+  }
+  const waits = [document.fonts.ready];
+  const mj = window.MathJax;
+  if (mj && mj.startup && mj.startup.promise) {
+    waits.push(mj.startup.promise);
+  } else if (mj && mj.Hub && mj.Hub.Queue) {
+    waits.push(new Promise((resolve) => mj.Hub.Queue(resolve)));
+  }
+  for (const img of document.images) {
+    if (!img.complete) {
+      waits.push(new Promise((resolve) => {
+        img.addEventListener("load", resolve, { once: true });
+        img.addEventListener("error", resolve, { once: true });
+      }));
+    }
+  }
+  const timer = new Promise((resolve) => setTimeout(() => resolve(false), timeoutMs));
+  return Promise.race([Promise.all(waits).then(() => true), timer]);
+}
+"""
 
-@dataclass(frozen=True)
-class RenderRecord:
-    index: int
-    post: Post
-    pdf_path: Path
-    status: str
-    failure_reason: str | None
-    page_count: int | None
-    rendered: bool
+_stream_fallback_warned = False
 
 
 @dataclass(frozen=True)
-class RenderOutput:
-    pdf_paths: List[Path]
-    rendered_posts: List[Post]
-    records: List[RenderRecord]
-    manifest_path: Path | None
-
-    def __iter__(self):
-        yield self.pdf_paths
-        yield self.rendered_posts
+class RenderOptions:
+    """How chapters are rendered and which existing ones are reused (local and distributed runs)."""
+
+    # Extra wait for MathJax, capped by profile.max_delay_ms
+    delay_ms: int = 4000
+    # Only chapters of the same profile are reused, so keep the output directory
+    # and manifest separate per profile
+    profile: RenderProfile = STANDARD_PROFILE
+    resume: bool = False
+    retry_failed: bool = False
+    # With resume: render again when the article changed (ETag / Last-Modified /
+    # .PostContent hash) since its chapter was rendered
+    check_changes: bool = False
+    check_workers: int = DEFAULT_CHECK_WORKERS
+    # Shared on-disk cache for static assets
+    asset_cache_dir: Path | None = None
+    # Print through the DevTools stream, falling back to page.pdf()
+    stream_pdf: bool = True
+    # Endpoint file of a running browser-server; Chromium is launched when it is gone
+    browser_server: Path | None = None
 
 
 def _safe_filename(title: str) -> str:
@@ -123,97 +181,55 @@ def _safe_filename(title: str) -> str:
     return simplified or "article"
 
 
-def _make_task(index: int, post: Post, output_dir: Path) -> RenderTask:
+def make_task(index: int, post: Post, output_dir: Path) -> RenderTask:
+    """The task for the ``index``-th post, with its chapter file in ``output_dir``."""
     filename = f"{index:03d}-{_safe_filename(post.title)}.pdf"
     return RenderTask(index=index, post=post, pdf_path=output_dir / filename)
 
 
-def _format_failure(exc: BaseException) -> str:
-    message = str(exc).strip().splitlines()
-    return (message[0] if message else exc.__class__.__name__)[:1000]
-
-
-def _pdf_page_count(path: Path) -> int | None:
-    if not path.exists() or not path.is_file():
-        return None
-
-    try:
-        reader = PdfReader(str(path))
-        page_count = len(reader.pages)
-    except Exception:
-        return None
-
-    return page_count if page_count > 0 else None
-
-
-def _resolve_manifest_pdf_path(entry: dict[str, Any], manifest_dir: Path) -> Path | None:
-    pdf_path = entry.get("pdf_path")
-    if not isinstance(pdf_path, str) or not pdf_path:
-        return None
-
-    path = Path(pdf_path)
-    return path if path.is_absolute() else manifest_dir / path
-
-
-def _display_pdf_path(path: Path, manifest_dir: Path) -> str:
-    try:
-        return str(path.resolve(strict=False).relative_to(manifest_dir.resolve()))
-    except ValueError:
-        return str(path)
+def _block_images(route, request) -> None:
+    # 后注册的路由先执行：图片直接中止，其他请求交给资源缓存（或原样放行）
+    if request.resource_type == "image":
+        route.abort()
+    else:
+        route.fallback()
 
 
-def _record_to_manifest_entry(
-    record: RenderRecord, manifest_dir: Path
-) -> dict[str, Any]:
-    return {
-        "index": record.index,
-        "title": record.post.title,
-        "url": record.post.url,
-        "date": record.post.date.isoformat(),
-        "pdf_path": _display_pdf_path(record.pdf_path, manifest_dir),
-        "status": record.status,
-        "failure_reason": record.failure_reason,
-        "page_count": record.page_count,
-        "rendered": record.rendered,
-    }
+def new_render_context(
+    browser,
+    asset_cache: AssetCache | None = None,
+    profile: RenderProfile = STANDARD_PROFILE,
+):
+    """Open a browser context set up for rendering chapters with ``profile``."""
+    context = browser.new_context(viewport=VIEWPORT, ignore_https_errors=True)
+    if asset_cache is not None:
+        asset_cache.attach(context)
+    if not profile.load_images:
+        context.route("**/*", _block_images)
+    return context
 
 
-def _load_manifest_entries(manifest_path: Path) -> list[dict[str, Any]]:
-    with manifest_path.open("r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    entries = data.get("entries")
-    if not isinstance(entries, list):
-        raise ValueError(f"manifest 缺少 entries 列表: {manifest_path}")
-
-    return [entry for entry in entries if isinstance(entry, dict)]
-
-
-def _write_manifest(manifest_path: Path, records: list[RenderRecord]) -> None:
-    manifest_path.parent.mkdir(parents=True, exist_ok=True)
-    manifest_dir = manifest_path.parent
-    sorted_records = sorted(records, key=lambda record: record.index)
-    data = {
-        "schema_version": MANIFEST_SCHEMA_VERSION,
-        "generated_at": datetime.now(timezone.utc).isoformat(),
-        "entries": [
-            _record_to_manifest_entry(record, manifest_dir)
-            for record in sorted_records
-        ],
-    }
-
-    with manifest_path.open("w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-        f.write("\n")
+def format_failure(exc: BaseException, limit: int = 1000) -> str:
+    """First line of the exception message (or its type), cut to ``limit`` characters."""
+    message = str(exc).strip().splitlines()
+    return (message[0] if message else exc.__class__.__name__)[:limit]
 
 
-def _navigate_with_retries(page: Page, url: str) -> None:
+def _navigate_with_retries(
+    page: Page, url: str, timeout_ms: int | None = None
+) -> Response | None:
     """
     Try loading the page up to three times with progressively looser conditions/timeouts:
     1) goto with load (75s)
     2) reload with domcontentloaded (90s)
     3) fresh goto with domcontentloaded (120s)
+
+    With ``timeout_ms`` (draft profile) there is a single domcontentloaded attempt.
+    Returns the navigation response of the attempt that succeeded.
     """
+    if timeout_ms is not None:
+        return page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
+
     attempts = [
         ("goto-load", lambda: page.goto(url, wait_until="load", timeout=75_000)),
         (
@@ -229,136 +245,739 @@ def _navigate_with_retries(page: Page, url: str) -> None:
     last_exc: PlaywrightError | None = None
     for _, attempt in attempts:
         try:
-            attempt()
-            return
+            return attempt()
         except PlaywrightError as exc:
             last_exc = exc
     if last_exc:
         raise last_exc
+    return None
 
 
-def _render_single(page: Page, post: Post, target: Path, delay_ms: int) -> None:
-    _navigate_with_retries(page, post.url)
-    page.emulate_media(media="screen")
-    page.wait_for_timeout(delay_ms)
-    page.add_style_tag(content=PRINT_CSS)
-    page.wait_for_timeout(200)
-    target.parent.mkdir(parents=True, exist_ok=True)
-    page.pdf(
-        path=str(target),
+def _source_fingerprint(response: Response | None) -> SourceFingerprint | None:
+    if response is None:
+        return None
+    try:
+        html = response.text()
+    except PlaywrightError:
+        html = None
+    return fingerprint_from_response(response.headers, html)
+
+
+def _source_fields(source: SourceFingerprint | None) -> dict[str, str | None]:
+    if source is None:
+        return {}
+    return {
+        "etag": source.etag,
+        "last_modified": source.last_modified,
+        "content_hash": source.content_hash,
+    }
+
+
+def _inches(length: str) -> float:
+    # 只需要处理本模块里用到的 "NNmm" 形式
+    return float(length.removesuffix("mm")) / 25.4
+
+
+def _print_to_pdf_params(print_background: bool = True) -> dict[str, Any]:
+    # 与 page.pdf(format="A4", margin=PDF_MARGINS, print_background=..., scale=PDF_SCALE)
+    # 传给 Chromium 的参数一致
+    return {
+        "paperWidth": A4_PAPER_INCHES[0],
+        "paperHeight": A4_PAPER_INCHES[1],
+        "marginTop": _inches(PDF_MARGINS["top"]),
+        "marginBottom": _inches(PDF_MARGINS["bottom"]),
+        "marginLeft": _inches(PDF_MARGINS["left"]),
+        "marginRight": _inches(PDF_MARGINS["right"]),
+        "printBackground": print_background,
+        "scale": PDF_SCALE,
+        "preferCSSPageSize": False,
+        "transferMode": "ReturnAsStream",
+    }
+
+
+def _read_stream(cdp, handle: str, write) -> None:
+    while True:
+        chunk = cdp.send("IO.read", {"handle": handle, "size": STREAM_CHUNK_BYTES})
+        data = chunk.get("data", "")
+        write(base64.b64decode(data) if chunk.get("base64Encoded") else data.encode("latin-1"))
+        if chunk.get("eof"):
+            return
+
+
+def _print_streamed(
+    page: Page, target: Path | None, print_background: bool = True
+) -> bytes | None:
+    """
+    Print through DevTools ``Page.printToPDF`` in stream mode and read it in chunks.
+
+    ``page.pdf()`` hands the whole document to Python as one protocol message;
+    here every ``IO.read`` carries at most ``STREAM_CHUNK_BYTES``, and chunks go
+    straight to ``target`` (atomically replaced at the end). Returns the bytes
+    only when ``target`` is None.
+    """
+    cdp = page.context.new_cdp_session(page)
+    try:
+        handle = cdp.send("Page.printToPDF", _print_to_pdf_params(print_background))["stream"]
+        try:
+            if target is None:
+                buffer = bytearray()
+                _read_stream(cdp, handle, buffer.extend)
+                return bytes(buffer)
+
+            tmp_path = target.with_name(f".{target.name}.part")
+            try:
+                with tmp_path.open("wb") as out:
+                    _read_stream(cdp, handle, out.write)
+                os.replace(tmp_path, target)
+            finally:
+                tmp_path.unlink(missing_ok=True)
+            return None
+        finally:
+            try:
+                cdp.send("IO.close", {"handle": handle})
+            except PlaywrightError:
+                pass
+    finally:
+        try:
+            cdp.detach()
+        except PlaywrightError:
+            pass
+
+
+def _print_pdf(
+    page: Page, target: Path | None, stream: bool, print_background: bool = True
+) -> bytes | None:
+    global _stream_fallback_warned
+    if stream:
+        try:
+            return _print_streamed(page, target, print_background)
+        except PlaywrightError as exc:
+            # 浏览器不支持 CDP（非 Chromium）或流式传输失败时退回 page.pdf()
+            if not _stream_fallback_warned:
+                print(f"[render] warn 流式打印不可用，改用 page.pdf(): {format_failure(exc)}")
+                _stream_fallback_warned = True
+    return page.pdf(
+        path=str(target) if target is not None else None,
         format="A4",
         margin=PDF_MARGINS,
-        print_background=True,
+        print_background=print_background,
         scale=PDF_SCALE,
     )
 
 
-def _render_task(
-    context,
+def _wait_for_assets(page: Page, post: Post) -> None:
+    try:
+        settled = page.evaluate(WAIT_FOR_ASSETS_JS, ASSET_WAIT_MS)
+    except PlaywrightError as exc:
+        print(f"[render] warn 等待公式/字体/图片失败，直接打印: {post.url} ({format_failure(exc)})")
+        return
+    if not settled:
+        print(f"[render] warn 公式/字体/图片 {ASSET_WAIT_MS // 1000}s 内未全部完成，直接打印: {post.url}")
+
+
+def _render_single(
+    page: Page,
+    post: Post,
+    target: Path | None,
+    delay_ms: int,
+    stream: bool = True,
+    profile: RenderProfile = STANDARD_PROFILE,
+) -> tuple[bytes | None, SourceFingerprint | None]:
+    """
+    Print the post to ``target``, or only return the PDF bytes when ``target`` is None.
+
+    Also returns the fingerprint of the article HTML that was printed. With
+    ``stream`` (the default) a successful streamed print to ``target`` returns
+    no bytes, so the chapter is never held in memory. ``profile`` decides the
+    navigation timeout, the delay cap, the asset wait and background printing.
+    """
+    source = _source_fingerprint(
+        _navigate_with_retries(page, post.url, profile.navigation_timeout_ms)
+    )
+    page.emulate_media(media="screen")
+    page.wait_for_timeout(profile.effective_delay_ms(delay_ms))
+    if profile.wait_for_assets:
+        _wait_for_assets(page, post)
+    page.add_style_tag(content=PRINT_CSS)
+    page.wait_for_timeout(200)
+    if target is not None:
+        target.parent.mkdir(parents=True, exist_ok=True)
+    return _print_pdf(page, target, stream, profile.print_background), source
+
+
+def _render_in_memory(
+    page: Page,
     task: RenderTask,
     delay_ms: int,
-    position: int,
-    total: int,
-    prefix: str,
+    stream: bool = True,
+    profile: RenderProfile = STANDARD_PROFILE,
 ) -> RenderRecord:
-    page = context.new_page()
-    try:
-        print(f"{prefix} {position}/{total} #{task.index:03d}: {task.post.url}")
-        _render_single(page, task.post, task.pdf_path, delay_ms)
-        page_count = _pdf_page_count(task.pdf_path)
-        if page_count is None:
-            return RenderRecord(
-                index=task.index,
-                post=task.post,
-                pdf_path=task.pdf_path,
-                status="failed",
-                failure_reason="Rendered PDF is missing, unreadable, or empty",
-                page_count=None,
-                rendered=True,
-            )
+    # 直接在内存中校验打印结果，磁盘上的章节文件只作为缓存写一次
+    data, source = _render_single(
+        page, task.post, None, delay_ms, stream=stream, profile=profile
+    )
+    checked = inspect_pdf_bytes(data) if data else None
+    if checked is None:
+        return RenderRecord(
+            index=task.index,
+            post=task.post,
+            pdf_path=task.pdf_path,
+            status="failed",
+            failure_reason="Rendered PDF is unreadable or empty",
+            page_count=None,
+            rendered=True,
+        )
+
+    info = store_chapter(task.pdf_path, data, *checked)
+    return RenderRecord(
+        index=task.index,
+        post=task.post,
+        pdf_path=task.pdf_path,
+        status="success",
+        failure_reason=None,
+        page_count=info.page_count,
+        rendered=True,
+        file_size=info.file_size,
+        mtime_ns=info.mtime_ns,
+        sha256=info.sha256,
+        pdf_data=data,
+        **_source_fields(source),
+    )
 
+
+def _render_to_file(
+    page: Page,
+    task: RenderTask,
+    delay_ms: int,
+    stream: bool = True,
+    profile: RenderProfile = STANDARD_PROFILE,
+) -> RenderRecord:
+    _, source = _render_single(
+        page, task.post, task.pdf_path, delay_ms, stream=stream, profile=profile
+    )
+    info = inspect_chapter(task.pdf_path)
+    if info is None:
         return RenderRecord(
             index=task.index,
             post=task.post,
             pdf_path=task.pdf_path,
-            status="success",
-            failure_reason=None,
-            page_count=page_count,
+            status="failed",
+            failure_reason="Rendered PDF is missing, unreadable, or empty",
+            page_count=None,
             rendered=True,
         )
+
+    return RenderRecord(
+        index=task.index,
+        post=task.post,
+        pdf_path=task.pdf_path,
+        status="success",
+        failure_reason=None,
+        page_count=info.page_count,
+        rendered=True,
+        file_size=info.file_size,
+        mtime_ns=info.mtime_ns,
+        sha256=info.sha256,
+        **_source_fields(source),
+    )
+
+
+def _format_mb(size: int | None) -> str:
+    return "-" if size is None else f"{size / (1024 * 1024):.0f} MB"
+
+
+def render_task(
+    context,
+    task: RenderTask,
+    delay_ms: int,
+    position: int,
+    total: int,
+    prefix: str,
+    in_memory: bool = False,
+    stream: bool = True,
+    profile: RenderProfile = STANDARD_PROFILE,
+    attached: bool = False,
+) -> RenderRecord:
+    """
+    Render one task in a new page of ``context``; failures become failed records.
+
+    ``attached`` means the browser belongs to a ``browser-server``, so its memory
+    is not this worker's and ``browser_peak_rss`` stays None.
+    """
+    page = context.new_page()
+    probe = PeakMemoryProbe(measure_browser=not attached)
+    probe.start()
+    started = time.monotonic()
+    try:
+        print(f"{prefix} {position}/{total} #{task.index:03d}: {task.post.url}")
+        if in_memory:
+            record = _render_in_memory(page, task, delay_ms, stream=stream, profile=profile)
+        else:
+            record = _render_to_file(page, task, delay_ms, stream=stream, profile=profile)
     except Exception as exc:
         print(f"{prefix} warn #{task.index:03d} 渲染失败，跳过: {task.post.url} ({exc})")
-        return RenderRecord(
+        record = RenderRecord(
             index=task.index,
             post=task.post,
             pdf_path=task.pdf_path,
             status="failed",
-            failure_reason=_format_failure(exc),
+            failure_reason=format_failure(exc),
             page_count=None,
             rendered=True,
         )
     finally:
+        # 失败的文章（例如内存暴涨导致崩溃）同样记录峰值内存
+        worker_peak, browser_peak = probe.stop()
         try:
             page.close()
         except Exception:
             pass
 
+    record = replace(record, worker_peak_rss=worker_peak, browser_peak_rss=browser_peak)
+    if record.status != "success":
+        return record
+
+    record = replace(record, render_seconds=round(time.monotonic() - started, 3))
+    print(
+        f"{prefix} #{task.index:03d} 完成: {record.page_count} 页，{record.render_seconds:.1f}s，"
+        f"峰值内存 worker {_format_mb(worker_peak)} / 浏览器 {_format_mb(browser_peak)}"
+    )
+    return record
+
+
+class _MemoryBudget:
+    """Running total of in-memory chapter bytes, applied as each record arrives."""
+
+    def __init__(self, budget_bytes: int) -> None:
+        self.budget_bytes = budget_bytes
+        self.kept = 0
+
+    def admit(self, record: RenderRecord) -> RenderRecord:
+        # 超出预算的章节丢弃内存副本，合并时回退到读取磁盘缓存
+        if record.pdf_data is None:
+            return record
+        if self.kept + len(record.pdf_data) > self.budget_bytes:
+            return replace(record, pdf_data=None)
+        self.kept += len(record.pdf_data)
+        return record
 
-def _render_batch(
+
+def _supervised_worker(
+    worker_id: int,
+    inbox,
+    results,
+    delay_ms: int,
+    in_memory: bool,
+    total: int,
+    asset_cache_dir: Path | None = None,
+    stream: bool = True,
+    browser_server: Path | None = None,
+    profile: RenderProfile = STANDARD_PROFILE,
+) -> None:
+    """
+    子进程：逐个接收 task 并立即回报结果，浏览器崩溃后下次任务前重新启动。
+
+    消息格式: ("done" | "crashed", worker_id, RenderRecord)。"crashed" 表示渲染期间
+    浏览器断开，由主进程决定是否重新排队。启用资源缓存时，退出前再发送
+    ("stats", worker_id, AssetCacheStats)。
+    """
+    prefix = f"[worker pid={os.getpid()}]"
+    position = 0
+    asset_cache = AssetCache(asset_cache_dir) if asset_cache_dir is not None else None
+    with sync_playwright() as p:
+        browser = None
+        context = None
+        attached = False
+        while True:
+            task = inbox.get()
+            if task is None:
+                break
+            if browser is None or not browser.is_connected():
+                # 浏览器服务是池时按 worker 编号分散到不同的 Chromium
+                browser, attached = launch_or_attach(p, browser_server, slot=worker_id)
+                context = new_render_context(browser, asset_cache, profile)
+
+            position += 1
+            record = render_task(
+                context,
+                task,
+                delay_ms,
+                position,
+                total,
+                prefix=prefix,
+                in_memory=in_memory,
+                stream=stream,
+                profile=profile,
+                attached=attached,
+            )
+            kind = "done"
+            if record.status != "success" and not browser.is_connected():
+                kind = "crashed"
+            results.put((kind, worker_id, record))
+
+        if browser is not None and browser.is_connected():
+            context.close()
+            browser.close()
+    if asset_cache is not None:
+        results.put(("stats", worker_id, asset_cache.stats))
+
+
+class _WorkerSlot:
+    def __init__(
+        self,
+        ctx,
+        worker_id: int,
+        results,
+        delay_ms: int,
+        in_memory: bool,
+        total: int,
+        asset_cache_dir: Path | None,
+        stream: bool,
+        browser_server: Path | None,
+        profile: RenderProfile,
+    ) -> None:
+        self.worker_id = worker_id
+        self.inbox = ctx.Queue()
+        self.task: RenderTask | None = None
+        self.process = ctx.Process(
+            target=_supervised_worker,
+            args=(
+                worker_id,
+                self.inbox,
+                results,
+                delay_ms,
+                in_memory,
+                total,
+                asset_cache_dir,
+                stream,
+                browser_server,
+                profile,
+            ),
+            daemon=True,
+        )
+        self.process.start()
+
+    def assign(self, task: RenderTask) -> None:
+        self.task = task
+        self.inbox.put(task)
+
+
+def _render_supervised(
     tasks: List[RenderTask],
+    workers: int,
     delay_ms: int,
+    in_memory: bool,
+    max_task_attempts: int,
+    asset_cache_dir: Path | None = None,
+    cache_stats: AssetCacheStats | None = None,
+    stream: bool = True,
+    browser_server: Path | None = None,
+    profile: RenderProfile = STANDARD_PROFILE,
+    on_record: Callable[[RenderRecord], None] | None = None,
+    memory_budget: _MemoryBudget | None = None,
 ) -> List[RenderRecord]:
     """
-    子进程中渲染一批 task，返回每篇文章的渲染记录。
+    用受监督的子进程并行渲染：每个 worker 一次只领一个 task，完成即回报。
+
+    worker 进程退出（Chromium 崩溃、OOM、管道断开）时只有它手上那一篇会重新排队，
+    同一篇累计崩溃 ``max_task_attempts`` 次后记为失败，避免一篇“毒文章”拖垮整批。
+    各 worker 的资源缓存统计在正常退出时累加到 ``cache_stats``。每篇的最终结果
+    （成功或放弃）一确定就交给 ``on_record``。
     """
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    pending = deque(tasks)
+    attempts: dict[int, int] = {}
     records: List[RenderRecord] = []
+    # 连续崩溃且期间没有任何成功时，说明环境本身有问题（例如浏览器无法启动）
+    crash_streak = 0
+    crash_streak_limit = workers * max_task_attempts + 1
+    next_id = 0
+
+    def finish(record: RenderRecord) -> None:
+        if memory_budget is not None:
+            record = memory_budget.admit(record)
+        records.append(record)
+        if on_record is not None:
+            on_record(record)
+
+    def spawn() -> _WorkerSlot:
+        nonlocal next_id
+        next_id += 1
+        return _WorkerSlot(
+            ctx,
+            next_id,
+            results,
+            delay_ms,
+            in_memory,
+            len(tasks),
+            asset_cache_dir,
+            stream,
+            browser_server,
+            profile,
+        )
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        context = browser.new_context(viewport=VIEWPORT, ignore_https_errors=True)
-        total = len(tasks)
-
-        for position, task in enumerate(tasks, start=1):
-            records.append(
-                _render_task(
-                    context,
-                    task,
-                    delay_ms,
-                    position,
-                    total,
-                    prefix=f"[worker pid={os.getpid()}]",
-                )
-            )
+    def handle_crash(task: RenderTask, reason: str) -> None:
+        nonlocal crash_streak
+        crash_streak += 1
+        attempts[task.index] = attempts.get(task.index, 0) + 1
+        if attempts[task.index] >= max_task_attempts:
+            print(f"[render] warn #{task.index:03d} 累计 {attempts[task.index]} 次导致 worker 崩溃，放弃")
+            finish(_failed_without_render(task, reason))
+        else:
+            print(f"[render] warn #{task.index:03d} worker 崩溃，重新排队: {reason}")
+            pending.appendleft(task)
+
+    def handle_result(kind: str, worker_id: int, payload: Any) -> None:
+        nonlocal crash_streak
+        if kind == "stats":
+            if cache_stats is not None:
+                cache_stats.add(payload)
+            return
+        record: RenderRecord = payload
+        slot = slots.get(worker_id)
+        if slot is None or slot.task is None or slot.task.index != record.index:
+            return
+        task = slot.task
+        slot.task = None
+        if kind == "crashed":
+            handle_crash(task, record.failure_reason or "Browser crashed")
+            return
+        if record.status == "success":
+            crash_streak = 0
+        finish(record)
 
-        browser.close()
+    slots = {slot.worker_id: slot for slot in (spawn() for _ in range(workers))}
+    try:
+        while pending or any(slot.task is not None for slot in slots.values()):
+            if crash_streak >= crash_streak_limit:
+                print("[render] warn worker 连续崩溃，放弃剩余任务")
+                for slot in slots.values():
+                    if slot.task is not None:
+                        pending.append(slot.task)
+                        slot.task = None
+                for task in pending:
+                    finish(_failed_without_render(task, "Render workers keep crashing"))
+                pending.clear()
+                break
+
+            for slot in slots.values():
+                if slot.task is None and pending and slot.process.is_alive():
+                    slot.assign(pending.popleft())
+
+            try:
+                handle_result(*results.get(timeout=1.0))
+            except queue.Empty:
+                pass
+
+            dead = [slot for slot in slots.values() if not slot.process.is_alive()]
+            if not dead:
+                continue
+            # 先取走已经发出的结果，避免把“完成后才退出”的 worker 误判为崩溃
+            while True:
+                try:
+                    handle_result(*results.get_nowait())
+                except queue.Empty:
+                    break
+            for slot in dead:
+                del slots[slot.worker_id]
+                if slot.task is not None:
+                    handle_crash(
+                        slot.task,
+                        f"Render worker exited with code {slot.process.exitcode}",
+                    )
+                if pending:
+                    new_slot = spawn()
+                    slots[new_slot.worker_id] = new_slot
+    finally:
+        for slot in slots.values():
+            try:
+                slot.inbox.put(None)
+            except Exception:
+                pass
+        if asset_cache_dir is not None:
+            _collect_worker_stats(slots, results, handle_result)
+        for slot in slots.values():
+            slot.process.join(timeout=10)
+            if slot.process.is_alive():
+                slot.process.terminate()
 
     return records
 
 
-def _reuse_record(task: RenderTask, page_count: int, pdf_path: Path) -> RenderRecord:
+def _collect_worker_stats(slots: dict[int, _WorkerSlot], results, handle_result) -> None:
+    # worker 收到 None 后关闭浏览器并发回缓存统计；已退出的 worker 不再等待
+    waiting = {worker_id for worker_id, slot in slots.items() if slot.process.is_alive()}
+    deadline = time.monotonic() + 30
+    while waiting and time.monotonic() < deadline:
+        try:
+            kind, worker_id, payload = results.get(timeout=0.5)
+        except queue.Empty:
+            waiting = {worker_id for worker_id in waiting if slots[worker_id].process.is_alive()}
+            continue
+        handle_result(kind, worker_id, payload)
+        if kind == "stats":
+            waiting.discard(worker_id)
+    while True:
+        try:
+            handle_result(*results.get_nowait())
+        except queue.Empty:
+            break
+
+
+class RenderSession:
+    """
+    A Chromium instance kept warm across several ``render_posts_to_pdfs`` calls.
+
+    The browser is launched lazily and relaunched if it has crashed or been
+    disconnected, so long-running callers can keep one session for hours.
+    With ``asset_cache_dir`` static assets are served from the shared on-disk
+    cache (see :class:`AssetCache`); with ``browser_server`` the session attaches
+    to a running ``browser-server`` instead of launching its own Chromium.
+    Its context is set up for ``profile``, which every render through it uses.
+    """
+
+    def __init__(
+        self,
+        asset_cache_dir: Path | None = None,
+        browser_server: Path | None = None,
+        profile: RenderProfile = STANDARD_PROFILE,
+    ) -> None:
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self.launches = 0
+        self.attached = False
+        self.asset_cache = AssetCache(asset_cache_dir) if asset_cache_dir is not None else None
+        self.browser_server = browser_server
+        self.profile = profile
+
+    def context(self):
+        if self._browser is None or not self._browser.is_connected():
+            self._launch()
+        return self._context
+
+    def _launch(self) -> None:
+        self._close_browser()
+        if self._playwright is None:
+            self._playwright = sync_playwright().start()
+        self._browser, self.attached = launch_or_attach(self._playwright, self.browser_server)
+        self._context = new_render_context(
+            self._browser, self.asset_cache, self.profile
+        )
+        if not self.attached:
+            self.launches += 1
+
+    def _close_browser(self) -> None:
+        if self._context is not None and self.attached:
+            # 共享的浏览器只关闭自己的上下文；browser.close() 随后只断开连接
+            try:
+                self._context.close()
+            except Exception:
+                pass
+        if self._browser is not None:
+            try:
+                self._browser.close()
+            except Exception:
+                pass
+        self._browser = None
+        self._context = None
+
+    def close(self) -> None:
+        self._close_browser()
+        if self._playwright is not None:
+            self._playwright.stop()
+            self._playwright = None
+
+    def __enter__(self) -> "RenderSession":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _reuse_record(task: RenderTask, info: ChapterInfo, pdf_path: Path) -> RenderRecord:
     return RenderRecord(
         index=task.index,
         post=task.post,
         pdf_path=pdf_path,
         status="success",
         failure_reason=None,
-        page_count=page_count,
+        page_count=info.page_count,
         rendered=False,
+        file_size=info.file_size,
+        mtime_ns=info.mtime_ns,
+        sha256=info.sha256,
+    )
+
+
+def _trusted_info(
+    previous: dict[str, Any] | None, previous_path: Path | None
+) -> ChapterInfo | None:
+    """Return the manifest's chapter info if the file on disk is unchanged since then."""
+    if previous is None or previous_path is None or previous.get("status") != "success":
+        return None
+
+    page_count = previous.get("page_count")
+    file_size = previous.get("file_size")
+    mtime_ns = previous.get("mtime_ns")
+    sha256 = previous.get("sha256")
+    if not (
+        isinstance(page_count, int)
+        and page_count > 0
+        and isinstance(file_size, int)
+        and isinstance(mtime_ns, int)
+        and isinstance(sha256, str)
+    ):
+        return None
+
+    if file_signature(previous_path) != (file_size, mtime_ns):
+        return None
+    return ChapterInfo(
+        page_count=page_count, file_size=file_size, mtime_ns=mtime_ns, sha256=sha256
     )
 
 
-def _reuse_valid_record(
-    task: RenderTask, candidates: list[Path | None]
-) -> RenderRecord | None:
-    seen_paths: set[Path] = set()
-    for candidate in candidates:
-        if candidate is None or candidate in seen_paths:
+def _reuse_valid_records(
+    candidates: list[tuple[RenderTask, list[Path | None], dict[str, Any] | None, Path | None]],
+) -> dict[int, RenderRecord]:
+    """
+    Find a reusable chapter for each task, keyed by task index.
+
+    Chapters whose size and mtime still match the previous manifest are trusted
+    as-is; everything else is parsed, in parallel for large batches.
+    """
+    reused: dict[int, RenderRecord] = {}
+    to_validate: dict[int, list[Path]] = {}
+    tasks_by_index: dict[int, RenderTask] = {}
+
+    sources: dict[int, dict[str, str | None]] = {}
+
+    for task, paths, previous, previous_path in candidates:
+        if previous is not None:
+            sources[task.index] = source_fingerprint(previous)
+        trusted = _trusted_info(previous, previous_path)
+        if trusted is not None:
+            reused[task.index] = _reuse_record(task, trusted, previous_path)
             continue
-        seen_paths.add(candidate)
-        page_count = _pdf_page_count(candidate)
-        if page_count is not None:
-            return _reuse_record(task, page_count, candidate)
-    return None
+
+        unique_paths: list[Path] = []
+        for path in paths:
+            if path is not None and path not in unique_paths:
+                unique_paths.append(path)
+        tasks_by_index[task.index] = task
+        to_validate[task.index] = unique_paths
+
+    if to_validate:
+        print(
+            f"[render] 校验章节 PDF: 可信 {len(reused)} 篇，需重新解析 {len(to_validate)} 篇"
+        )
+    for index, (path, info) in find_valid_chapters(to_validate).items():
+        reused[index] = _reuse_record(tasks_by_index[index], info, path)
+    # 沿用上次渲染时记录的文章指纹，供 --check-changes 比较
+    return {
+        index: replace(record, **sources.get(index, {})) for index, record in reused.items()
+    }
 
 
 def _failed_without_render(task: RenderTask, reason: str) -> RenderRecord:
@@ -373,12 +992,65 @@ def _failed_without_render(task: RenderTask, reason: str) -> RenderRecord:
     )
 
 
-def _select_tasks(
+def _recheck_reused(
+    records: list[RenderRecord],
+    tasks: list[RenderTask],
+    workers: int,
+) -> tuple[list[RenderTask], list[RenderRecord]]:
+    """
+    Probe the live articles behind reused chapters; return the tasks to re-render
+    and the records that stay, with refreshed validators.
+    """
+    candidates = [
+        record for record in records if record.status == "success" and not record.rendered
+    ]
+    if not candidates:
+        return [], records
+
+    print(f"[render] 检查文章是否有更新: {len(candidates)} 篇")
+    checks = check_for_changes(candidates, workers=workers)
+    tasks_by_index = {task.index: task for task in tasks}
+    changed: list[RenderTask] = []
+    kept: list[RenderRecord] = []
+    counts = {"unchanged": 0, "changed": 0, "baseline": 0, "error": 0}
+    for record in records:
+        check = checks.get(record.index)
+        if check is None:
+            kept.append(record)
+            continue
+        counts[check.status] += 1
+        if check.status == "changed":
+            print(f"[render] 文章已更新，重新渲染: #{record.index:03d} {record.post.url}")
+            changed.append(tasks_by_index[record.index])
+            continue
+        if check.status == "error":
+            print(f"[render] warn 检查失败，沿用旧章节: #{record.index:03d} {record.post.url} ({check.detail})")
+        elif check.fingerprint is not None:
+            record = replace(record, **_source_fields(check.fingerprint))
+        kept.append(record)
+
+    print(
+        f"[render] 更新检查: 未变 {counts['unchanged']} 篇，已更新 {counts['changed']} 篇，"
+        f"首次记录指纹 {counts['baseline']} 篇，检查失败 {counts['error']} 篇"
+    )
+    return changed, kept
+
+
+def select_tasks(
     tasks: list[RenderTask],
     manifest_path: Path | None,
     resume: bool,
     retry_failed: bool,
+    check_changes: bool = False,
+    check_workers: int = DEFAULT_CHECK_WORKERS,
+    profile: RenderProfile = STANDARD_PROFILE,
 ) -> tuple[list[RenderTask], list[RenderRecord]]:
+    """
+    Split ``tasks`` into those to render and records reused from the manifest.
+
+    Only ``resume`` / ``retry_failed`` runs reuse anything, and only chapters of
+    the same ``profile``.
+    """
     tasks_to_render: list[RenderTask] = []
     prefilled_records: list[RenderRecord] = []
 
@@ -391,19 +1063,28 @@ def _select_tasks(
         if manifest_path is None:
             raise ValueError("--retry-failed 需要 manifest_path")
         manifest_dir = manifest_path.parent
+        # 其他渲染配置的章节不能复用（旧 manifest 没有 profile 字段，视为 standard）
         previous_by_url = {
             entry["url"]: entry
-            for entry in _load_manifest_entries(manifest_path)
+            for entry in load_manifest_entries(manifest_path)
             if isinstance(entry.get("url"), str)
+            and (entry.get("profile") or STANDARD_PROFILE.name) == profile.name
         }
 
+    # (task, candidate paths, previous manifest entry, previous path, failure reason
+    # if no valid chapter is found; None means render it instead)
+    reuse_checks: list[
+        tuple[RenderTask, list[Path | None], dict[str, Any] | None, Path | None, str | None]
+    ] = []
+
     for task in tasks:
         previous = previous_by_url.get(task.post.url)
         previous_path = (
-            _resolve_manifest_pdf_path(previous, manifest_dir)
+            resolve_manifest_pdf_path(previous, manifest_dir)
             if previous is not None and manifest_dir is not None
             else None
         )
+        candidates = [task.pdf_path, previous_path]
 
         if retry_failed:
             if previous is None:
@@ -415,118 +1096,214 @@ def _select_tasks(
                 continue
 
             if previous.get("status") == "success":
-                reused_record = _reuse_valid_record(task, [task.pdf_path, previous_path])
-                if reused_record is not None:
-                    prefilled_records.append(reused_record)
-                else:
-                    prefilled_records.append(
-                        _failed_without_render(
-                            task,
-                            "Previous success PDF is missing or invalid; run without --retry-failed to rebuild it",
-                        )
+                reuse_checks.append(
+                    (
+                        task,
+                        candidates,
+                        previous,
+                        previous_path,
+                        "Previous success PDF is missing or invalid; run without --retry-failed to rebuild it",
                     )
+                )
                 continue
 
             if resume:
-                reused_record = _reuse_valid_record(task, [task.pdf_path, previous_path])
-                if reused_record is not None:
-                    prefilled_records.append(reused_record)
-                    continue
+                reuse_checks.append((task, candidates, previous, previous_path, None))
+                continue
 
             tasks_to_render.append(task)
             continue
 
         if resume:
-            reused_record = _reuse_valid_record(task, [task.pdf_path, previous_path])
-            if reused_record is not None:
-                prefilled_records.append(reused_record)
-                continue
+            reuse_checks.append((task, candidates, previous, previous_path, None))
+            continue
 
         tasks_to_render.append(task)
 
+    reused = _reuse_valid_records([check[:4] for check in reuse_checks])
+    for task, _, _, _, invalid_reason in reuse_checks:
+        reused_record = reused.get(task.index)
+        if reused_record is not None:
+            prefilled_records.append(reused_record)
+        elif invalid_reason is not None:
+            prefilled_records.append(_failed_without_render(task, invalid_reason))
+        else:
+            tasks_to_render.append(task)
+
+    if check_changes:
+        changed, prefilled_records = _recheck_reused(prefilled_records, tasks, check_workers)
+        tasks_to_render.extend(changed)
+
+    tasks_to_render.sort(key=lambda task: task.index)
     return tasks_to_render, prefilled_records
 
 
 def render_posts_to_pdfs(
     posts: Iterable[Post],
     output_dir: Path,
-    delay_ms: int = 4000,
+    options: RenderOptions = RenderOptions(),
     workers: int = 1,
     manifest_path: Path | None = None,
-    resume: bool = False,
-    retry_failed: bool = False,
+    session: RenderSession | None = None,
+    in_memory: bool = False,
+    in_memory_max_mb: int = 1024,
+    max_task_attempts: int = 2,
+    on_record: Callable[[RenderRecord], None] | None = None,
 ) -> RenderOutput:
+    """
+    Render posts to chapter PDFs and return the records for every post.
+
+    A ``session`` keeps the browser warm across calls (watch mode) and brings its
+    own asset cache, browser server and profile. With ``in_memory`` the PDF bytes
+    stay on the successful records (``pdf_data``, up to ``in_memory_max_mb`` in
+    completion order) for the merge stage; chapter files are still written once
+    for --resume. Parallel runs dispatch the longest posts first using the render
+    history next to the manifest, and a post that crashes its worker
+    ``max_task_attempts`` times is marked failed. ``on_record`` receives each
+    post's final record as soon as it is known (reused chapters first), e.g. for
+    an :class:`~kexue_book.merge.OrderedBookWriter` that builds the book meanwhile.
+    """
+    profile = session.profile if session is not None else options.profile
+    # 调度模型、耗时历史都按实际等待的时长计算
+    delay_ms = profile.effective_delay_ms(options.delay_ms)
+    asset_cache_dir = options.asset_cache_dir
+    stream_pdf = options.stream_pdf
     posts_list = list(posts)
     output_dir.mkdir(parents=True, exist_ok=True)
 
     if not posts_list:
         if manifest_path is not None:
-            _write_manifest(manifest_path, [])
+            write_manifest(manifest_path, [])
         return RenderOutput([], [], [], manifest_path)
 
     tasks = [
-        _make_task(index, post, output_dir)
+        make_task(index, post, output_dir)
         for index, post in enumerate(posts_list, start=1)
     ]
-    tasks_to_render, records = _select_tasks(
-        tasks, manifest_path, resume=resume, retry_failed=retry_failed
+    tasks_to_render, records = select_tasks(
+        tasks,
+        manifest_path,
+        resume=options.resume,
+        retry_failed=options.retry_failed,
+        check_changes=options.check_changes,
+        check_workers=options.check_workers,
+        profile=profile,
     )
 
-    if resume:
+    if options.resume:
         reused = len([record for record in records if record.status == "success"])
         print(f"[render] resume: 复用已有有效 PDF {reused} 篇")
-    if retry_failed:
+    if options.retry_failed:
         print(f"[render] retry-failed: 本次需要重试 {len(tasks_to_render)} 篇")
 
+    def emit(record: RenderRecord) -> None:
+        if on_record is not None:
+            on_record(replace(record, profile=profile.name))
+
+    for record in records:
+        emit(record)
+
+    cache_stats = AssetCacheStats() if asset_cache_dir is not None else None
+    memory_budget = _MemoryBudget(in_memory_max_mb * 1024 * 1024)
+
+    if tasks_to_render and session is not None:
+        # 复用调用方保持的常驻浏览器（watch 模式），不再冷启动 Chromium
+        total = len(tasks_to_render)
+        for position, task in enumerate(tasks_to_render, start=1):
+            context = session.context()
+            record = render_task(
+                context,
+                task,
+                delay_ms,
+                position,
+                total,
+                prefix="[render]",
+                in_memory=in_memory,
+                stream=stream_pdf,
+                profile=profile,
+                attached=session.attached,
+            )
+            record = memory_budget.admit(record)
+            records.append(record)
+            emit(record)
     # 单进程模式
-    if tasks_to_render and (workers <= 1 or len(tasks_to_render) <= 1):
+    elif tasks_to_render and (workers <= 1 or len(tasks_to_render) <= 1):
+        asset_cache = AssetCache(asset_cache_dir) if asset_cache_dir is not None else None
         with sync_playwright() as p:
-            browser = p.chromium.launch()
-            context = browser.new_context(viewport=VIEWPORT, ignore_https_errors=True)
+            browser, attached = launch_or_attach(p, options.browser_server)
+            context = new_render_context(browser, asset_cache, profile)
             total = len(tasks_to_render)
             for position, task in enumerate(tasks_to_render, start=1):
-                records.append(
-                    _render_task(
-                        context,
-                        task,
-                        delay_ms,
-                        position,
-                        total,
-                        prefix="[render]",
-                    )
+                record = render_task(
+                    context,
+                    task,
+                    delay_ms,
+                    position,
+                    total,
+                    prefix="[render]",
+                    in_memory=in_memory,
+                    stream=stream_pdf,
+                    profile=profile,
+                    attached=attached,
                 )
+                record = memory_budget.admit(record)
+                records.append(record)
+                emit(record)
+            context.close()
             browser.close()
+        if asset_cache is not None:
+            cache_stats = asset_cache.stats
     elif tasks_to_render:
-        # 并行模式
+        # 并行模式：受监督的 worker 逐篇回报，崩溃只影响当时在渲染的那一篇
         workers = min(workers, len(tasks_to_render))
-        chunk_size = math.ceil(len(tasks_to_render) / workers)
-        chunks: List[List[RenderTask]] = [
-            tasks_to_render[i : i + chunk_size]
-            for i in range(0, len(tasks_to_render), chunk_size)
-        ]
-
         print(
-            f"[render] 并行渲染 workers={len(chunks)}, total_posts={len(tasks_to_render)}"
+            f"[render] 并行渲染 workers={workers}, total_posts={len(tasks_to_render)}"
+        )
+        # 最长的文章先开始，避免它们排在最后单独拖长整批渲染
+        model = load_duration_model(
+            manifest_path.parent if manifest_path is not None else output_dir,
+            delay_ms,
+            manifest_path=manifest_path,
+            history_name=profile_artifact(HISTORY_NAME, profile.name),
+        )
+        ordered = longest_first(tasks_to_render, model)
+        estimate = simulate_makespan(
+            [model.estimate(task.post).seconds for task in ordered], workers
+        )
+        print(f"[render] 最长优先调度，预计耗时 {format_duration(estimate)}")
+        records.extend(
+            _render_supervised(
+                ordered,
+                workers,
+                delay_ms,
+                in_memory=in_memory,
+                max_task_attempts=max_task_attempts,
+                asset_cache_dir=asset_cache_dir,
+                cache_stats=cache_stats,
+                stream=stream_pdf,
+                browser_server=options.browser_server,
+                profile=profile,
+                on_record=emit,
+                memory_budget=memory_budget,
+            )
         )
 
-        with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
-            futures = {
-                executor.submit(_render_batch, chunk, delay_ms): chunk
-                for chunk in chunks
-            }
-            for fut in as_completed(futures):
-                try:
-                    records.extend(fut.result())
-                except Exception as exc:
-                    print(f"[worker error] 子进程异常: {exc}")
-                    records.extend(
-                        _failed_without_render(task, _format_failure(exc))
-                        for task in futures[fut]
-                    )
+    if tasks_to_render and session is not None and session.asset_cache is not None:
+        print(f"[render] 资源缓存（会话累计）: {session.asset_cache.stats.summary()}")
+    elif tasks_to_render and session is None and cache_stats is not None:
+        print(f"[render] 资源缓存: {cache_stats.summary()}")
 
-    records.sort(key=lambda record: record.index)
+    records = sorted(
+        (replace(record, profile=profile.name) for record in records),
+        key=lambda record: record.index,
+    )
     if manifest_path is not None:
-        _write_manifest(manifest_path, records)
+        write_manifest(manifest_path, records)
+        update_history(
+            manifest_path.parent / profile_artifact(HISTORY_NAME, profile.name),
+            records,
+            delay_ms,
+        )
 
     successful_records = [record for record in records if record.status == "success"]
     return RenderOutput(
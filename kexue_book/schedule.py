@@ -0,0 +1,225 @@
+"""Render-time history and longest-job-first ordering of render tasks."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from statistics import median
+from typing import Any, Iterable, List, Sequence
+import heapq
+import json
+
+from .manifest import load_manifest_entries, write_json
+from .types import Post, RenderRecord, RenderTask
+
+HISTORY_NAME = "render-history.json"
+HISTORY_SCHEMA_VERSION = 1
+# 没有任何历史时对单篇“除去 --delay-ms 之外”的耗时估计（加载 + 打印）
+DEFAULT_NET_SECONDS = 8.0
+# 每个 worker 启动 Chromium 的固定开销，计入 plan 的估算
+WORKER_STARTUP_SECONDS = 3.0
+# 拟合线性模型所需的最少样本数
+MIN_FIT_POINTS = 3
+
+
+@dataclass(frozen=True)
+class Estimate:
+    seconds: float
+    # "history" | "pages" | "text" | "default"
+    source: str
+
+
+def load_history(path: Path) -> dict[str, dict[str, Any]]:
+    """Return ``url -> {seconds, delay_ms, page_count, updated_at}``; empty if missing."""
+    if not path.exists():
+        return {}
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        print(f"[schedule] warn 渲染历史无法读取，忽略: {path}")
+        return {}
+    entries = data.get("entries")
+    if not isinstance(entries, dict):
+        return {}
+    return {url: entry for url, entry in entries.items() if isinstance(entry, dict)}
+
+
+def update_history(path: Path, records: Iterable[RenderRecord], delay_ms: int) -> int:
+    """Merge freshly rendered, timed records into the history file; returns how many."""
+    fresh = [
+        record
+        for record in records
+        if record.rendered and record.status == "success" and record.render_seconds is not None
+    ]
+    if not fresh:
+        return 0
+
+    entries = load_history(path)
+    now = datetime.now(timezone.utc).isoformat()
+    for record in fresh:
+        entries[record.post.url] = {
+            "seconds": round(record.render_seconds, 3),
+            "delay_ms": delay_ms,
+            "page_count": record.page_count,
+            "updated_at": now,
+        }
+    write_json(
+        path,
+        {
+            "schema_version": HISTORY_SCHEMA_VERSION,
+            "generated_at": now,
+            "entries": entries,
+        },
+    )
+    return len(fresh)
+
+
+def _net_seconds(entry: dict[str, Any]) -> float | None:
+    seconds = entry.get("seconds")
+    if not isinstance(seconds, (int, float)) or seconds <= 0:
+        return None
+    delay_ms = entry.get("delay_ms")
+    delay_s = delay_ms / 1000 if isinstance(delay_ms, (int, float)) else 0.0
+    return max(0.0, seconds - delay_s)
+
+
+def _fit_line(points: Sequence[tuple[float, float]]) -> tuple[float, float] | None:
+    """Least-squares ``y = a + b * x``; None without enough spread or with a non-positive slope."""
+    if len(points) < MIN_FIT_POINTS:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if var_x <= 0:
+        return None
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+    if slope <= 0:
+        return None
+    return max(0.0, mean_y - slope * mean_x), slope
+
+
+class DurationModel:
+    """
+    Per-post render time estimates, most specific source first:
+
+    1. the post's own duration in the render history;
+    2. its page count (from the history or the manifest) through a line fitted
+       on the history;
+    3. the length of its body text in the full-text index, fitted the same way;
+    4. the median historical duration, or a fixed default.
+
+    Durations are stored with the ``--delay-ms`` they were measured with and are
+    re-based on the current delay, which is a fixed cost per post.
+    """
+
+    def __init__(
+        self,
+        history: dict[str, dict[str, Any]],
+        delay_ms: int,
+        page_counts: dict[str, int] | None = None,
+        text_lengths: dict[str, int] | None = None,
+    ) -> None:
+        self.delay_s = delay_ms / 1000
+        self._net: dict[str, float] = {}
+        self._pages: dict[str, int] = dict(page_counts or {})
+        self._text_lengths = dict(text_lengths or {})
+
+        for url, entry in history.items():
+            net = _net_seconds(entry)
+            if net is not None:
+                self._net[url] = net
+            page_count = entry.get("page_count")
+            if isinstance(page_count, int) and page_count > 0:
+                self._pages.setdefault(url, page_count)
+
+        self._by_pages = _fit_line(
+            [(self._pages[url], net) for url, net in self._net.items() if url in self._pages]
+        )
+        self._by_text = _fit_line(
+            [
+                (self._text_lengths[url], net)
+                for url, net in self._net.items()
+                if url in self._text_lengths
+            ]
+        )
+        self._fallback = median(self._net.values()) if self._net else DEFAULT_NET_SECONDS
+
+    def estimate(self, post: Post) -> Estimate:
+        url = post.url
+        if url in self._net:
+            return Estimate(self._net[url] + self.delay_s, "history")
+        if url in self._pages and self._by_pages is not None:
+            intercept, slope = self._by_pages
+            return Estimate(intercept + slope * self._pages[url] + self.delay_s, "pages")
+        if url in self._text_lengths and self._by_text is not None:
+            intercept, slope = self._by_text
+            return Estimate(intercept + slope * self._text_lengths[url] + self.delay_s, "text")
+        return Estimate(self._fallback + self.delay_s, "default")
+
+
+def _index_text_lengths(index_path: Path | None) -> dict[str, int]:
+    if index_path is None or not index_path.exists():
+        return {}
+    from .index import ContentIndex
+
+    with ContentIndex(index_path) as index:
+        return index.text_lengths()
+
+
+def load_duration_model(
+    out_dir: Path,
+    delay_ms: int,
+    manifest_path: Path | None = None,
+    index_path: Path | None = None,
+    history_name: str = HISTORY_NAME,
+) -> DurationModel:
+    """Build a :class:`DurationModel` from the artifacts in ``out_dir``."""
+    page_counts: dict[str, int] = {}
+    if manifest_path is not None and manifest_path.exists():
+        try:
+            entries = load_manifest_entries(manifest_path)
+        except (OSError, ValueError):
+            entries = []
+        for entry in entries:
+            url, page_count = entry.get("url"), entry.get("page_count")
+            if isinstance(url, str) and isinstance(page_count, int) and page_count > 0:
+                page_counts[url] = page_count
+
+    if index_path is None:
+        from .index import INDEX_NAME
+
+        index_path = out_dir / INDEX_NAME
+    return DurationModel(
+        load_history(out_dir / history_name),
+        delay_ms,
+        page_counts=page_counts,
+        text_lengths=_index_text_lengths(index_path),
+    )
+
+
+def longest_first(tasks: Iterable[RenderTask], model: DurationModel) -> List[RenderTask]:
+    """Order tasks by estimated render time, longest first (ties keep index order)."""
+    return sorted(tasks, key=lambda task: (-model.estimate(task.post).seconds, task.index))
+
+
+def simulate_makespan(
+    durations: Sequence[float],
+    workers: int,
+    startup_seconds: float = WORKER_STARTUP_SECONDS,
+) -> float:
+    """Wall time when each task, in the given order, goes to the first idle worker."""
+    if not durations:
+        return 0.0
+    free_at = [startup_seconds] * max(1, min(workers, len(durations)))
+    heapq.heapify(free_at)
+    for duration in durations:
+        heapq.heappush(free_at, heapq.heappop(free_at) + duration)
+    return max(free_at)
+
+
+def format_duration(seconds: float) -> str:
+    minutes, secs = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:d}:{minutes:02d}:{secs:02d}"
@@ -0,0 +1,328 @@
+"""SQLite-backed render queue with leases, shared by a coordinator and any number of workers."""
+
+from __future__ import annotations
+
+from datetime import date
+from pathlib import Path
+from typing import Iterable
+import sqlite3
+import time
+
+from .profiles import DEFAULT_PROFILE, profile_artifact
+from .types import Post, RenderRecord, RenderTask
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    idx INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    url TEXT NOT NULL,
+    date TEXT NOT NULL,
+    pdf_name TEXT NOT NULL,
+    state TEXT NOT NULL,
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    status TEXT,
+    failure_reason TEXT,
+    page_count INTEGER,
+    updated_at REAL,
+    priority REAL NOT NULL DEFAULT 0,
+    render_seconds REAL,
+    etag TEXT,
+    last_modified TEXT,
+    content_hash TEXT,
+    file_size INTEGER,
+    mtime_ns INTEGER,
+    sha256 TEXT,
+    worker_peak_rss INTEGER,
+    browser_peak_rss INTEGER
+);
+CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, lease_expires);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class TaskQueue:
+    """
+    Lease-based queue of :class:`RenderTask` rows in a single SQLite file.
+
+    The file can live on a shared filesystem: workers claim a task with a
+    time-limited lease, extend it with :meth:`heartbeat` while rendering and
+    report the result with :meth:`complete`. Leases that expire (worker crash,
+    lost host) are handed out again until ``max_attempts`` is reached. Chapter
+    PDFs are stored next to the database in ``chapters/`` (``chapters-<profile>/``
+    for non-standard render profiles) so that every host resolves them relative
+    to its own mount point. Lease times use each host's
+    wall clock, so hosts should be NTP-synchronised and leases kept generous.
+    """
+
+    def __init__(self, path: Path, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> None:
+        self.path = path
+        self.lease_seconds = lease_seconds
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Rollback journal rather than WAL: WAL needs shared memory, which does not
+        # work across hosts on network filesystems.
+        self._conn = sqlite3.connect(str(path), timeout=60, isolation_level=None)
+        self._conn.execute("PRAGMA busy_timeout = 60000")
+        self._conn.executescript(_SCHEMA)
+
+    @property
+    def chapters_dir(self) -> Path:
+        profile = self.get_meta("profile", DEFAULT_PROFILE) or DEFAULT_PROFILE
+        return self.path.parent / profile_artifact("chapters", profile)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "TaskQueue":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front so two workers can never
+        # claim the same row.
+        return _Immediate(self._conn)
+
+    def get_meta(self, key: str, default: str | None = None) -> str | None:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def reset(
+        self,
+        tasks: Iterable[RenderTask],
+        delay_ms: int,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        priorities: dict[int, float] | None = None,
+        print_mode: str = "stream",
+        profile: str = DEFAULT_PROFILE,
+    ) -> int:
+        """
+        Replace the queue contents with ``tasks`` for a new run.
+
+        ``priorities`` (task index -> estimated seconds) makes workers claim the
+        longest tasks first; without it tasks are claimed in index order.
+        """
+        priorities = priorities or {}
+        now = time.time()
+        rows = [
+            (
+                task.index,
+                task.post.title,
+                task.post.url,
+                task.post.date.isoformat(),
+                task.pdf_path.name,
+                now,
+                priorities.get(task.index, 0.0),
+            )
+            for task in tasks
+        ]
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM tasks")
+            conn.executemany(
+                "INSERT INTO tasks (idx, title, url, date, pdf_name, state, updated_at, priority) "
+                "VALUES (?, ?, ?, ?, ?, 'pending', ?, ?)",
+                rows,
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [
+                    ("delay_ms", str(delay_ms)),
+                    ("max_attempts", str(max_attempts)),
+                    ("print_mode", print_mode),
+                    ("profile", profile),
+                ],
+            )
+        return len(rows)
+
+    def claim(self, worker: str) -> RenderTask | None:
+        """Lease the next pending (or expired) task to ``worker``."""
+        now = time.time()
+        max_attempts = int(self.get_meta("max_attempts", str(DEFAULT_MAX_ATTEMPTS)))
+        with self._transaction() as conn:
+            self._give_up_expired(conn, now, max_attempts)
+            row = conn.execute(
+                "SELECT idx, title, url, date, pdf_name FROM tasks "
+                "WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?) "
+                "ORDER BY priority DESC, idx LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE tasks SET state = 'leased', worker = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE idx = ?",
+                (worker, now + self.lease_seconds, now, row[0]),
+            )
+
+        index, title, url, post_date, pdf_name = row
+        return RenderTask(
+            index=index,
+            post=Post(title=title, url=url, date=date.fromisoformat(post_date)),
+            pdf_path=self.chapters_dir / pdf_name,
+        )
+
+    @staticmethod
+    def _give_up_expired(conn: sqlite3.Connection, now: float, max_attempts: int) -> int:
+        # Expired leases that already used up their attempts are given up for good.
+        cursor = conn.execute(
+            "UPDATE tasks SET state = 'failed', status = 'failed', worker = NULL, "
+            "failure_reason = 'Lease expired ' || attempts || ' times; worker lost', "
+            "updated_at = ? "
+            "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now, now, max_attempts),
+        )
+        return cursor.rowcount
+
+    def reap_expired(self) -> int:
+        """Fail expired leases that have no attempts left; returns how many."""
+        max_attempts = int(self.get_meta("max_attempts", str(DEFAULT_MAX_ATTEMPTS)))
+        with self._transaction() as conn:
+            return self._give_up_expired(conn, time.time(), max_attempts)
+
+    def heartbeat(self, index: int, worker: str) -> bool:
+        """Extend the lease; returns False if ``worker`` no longer holds it."""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET lease_expires = ?, updated_at = ? "
+                "WHERE idx = ? AND worker = ? AND state = 'leased'",
+                (now + self.lease_seconds, now, index, worker),
+            )
+        return cursor.rowcount > 0
+
+    def complete(self, worker: str, record: RenderRecord) -> bool:
+        """
+        Store the result of a leased task.
+
+        Failed renders go back to ``pending`` until ``max_attempts`` is used up, so
+        another host gets a chance. Returns False if the lease was lost meanwhile.
+        """
+        now = time.time()
+        max_attempts = int(self.get_meta("max_attempts", str(DEFAULT_MAX_ATTEMPTS)))
+        with self._transaction() as conn:
+            if record.status == "success":
+                cursor = conn.execute(
+                    "UPDATE tasks SET state = 'done', status = 'success', worker = NULL, "
+                    "failure_reason = NULL, page_count = ?, render_seconds = ?, etag = ?, "
+                    "last_modified = ?, content_hash = ?, file_size = ?, mtime_ns = ?, "
+                    "sha256 = ?, worker_peak_rss = ?, browser_peak_rss = ?, updated_at = ? "
+                    "WHERE idx = ? AND worker = ? AND state = 'leased'",
+                    (
+                        record.page_count,
+                        record.render_seconds,
+                        record.etag,
+                        record.last_modified,
+                        record.content_hash,
+                        record.file_size,
+                        record.mtime_ns,
+                        record.sha256,
+                        record.worker_peak_rss,
+                        record.browser_peak_rss,
+                        now,
+                        record.index,
+                        worker,
+                    ),
+                )
+            else:
+                cursor = conn.execute(
+                    "UPDATE tasks SET "
+                    "state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                    "status = 'failed', worker = NULL, failure_reason = ?, "
+                    "worker_peak_rss = ?, browser_peak_rss = ?, updated_at = ? "
+                    "WHERE idx = ? AND worker = ? AND state = 'leased'",
+                    (
+                        max_attempts,
+                        record.failure_reason,
+                        record.worker_peak_rss,
+                        record.browser_peak_rss,
+                        now,
+                        record.index,
+                        worker,
+                    ),
+                )
+        return cursor.rowcount > 0
+
+    def counts(self) -> dict[str, int]:
+        counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        for state, count in self._conn.execute(
+            "SELECT state, COUNT(*) FROM tasks GROUP BY state"
+        ):
+            counts[state] = count
+        return counts
+
+    def is_finished(self) -> bool:
+        counts = self.counts()
+        return counts["pending"] == 0 and counts["leased"] == 0
+
+    def records(self) -> list[RenderRecord]:
+        """Render records for every finished row, in index order."""
+        records: list[RenderRecord] = []
+        for row in self._conn.execute(
+            "SELECT idx, title, url, date, pdf_name, state, failure_reason, page_count, "
+            "render_seconds, etag, last_modified, content_hash, file_size, mtime_ns, sha256, "
+            "worker_peak_rss, browser_peak_rss "
+            "FROM tasks WHERE state IN ('done', 'failed') ORDER BY idx"
+        ):
+            (
+                index,
+                title,
+                url,
+                post_date,
+                pdf_name,
+                state,
+                failure_reason,
+                page_count,
+                render_seconds,
+                etag,
+                last_modified,
+                content_hash,
+                file_size,
+                mtime_ns,
+                sha256,
+                worker_peak_rss,
+                browser_peak_rss,
+            ) = row
+            records.append(
+                RenderRecord(
+                    index=index,
+                    post=Post(title=title, url=url, date=date.fromisoformat(post_date)),
+                    pdf_path=self.chapters_dir / pdf_name,
+                    status="success" if state == "done" else "failed",
+                    failure_reason=failure_reason,
+                    page_count=page_count,
+                    rendered=True,
+                    render_seconds=render_seconds,
+                    etag=etag,
+                    last_modified=last_modified,
+                    content_hash=content_hash,
+                    file_size=file_size,
+                    mtime_ns=mtime_ns,
+                    sha256=sha256,
+                    worker_peak_rss=worker_peak_rss,
+                    browser_peak_rss=browser_peak_rss,
+                )
+            )
+        return records
+
+
+class _Immediate:
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self._conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self._conn.execute("BEGIN IMMEDIATE")
+        return self._conn
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        if exc_type is None:
+            self._conn.execute("COMMIT")
+        else:
+            self._conn.execute("ROLLBACK")
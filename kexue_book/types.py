@@ -1,7 +1,9 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import date
+from pathlib import Path
+from typing import List
 
 
 @dataclass(frozen=True)
@@ -11,3 +13,59 @@ class Post:
     title: str
     url: str
     date: date
+
+
+@dataclass(frozen=True)
+class RenderTask:
+    index: int
+    post: Post
+    pdf_path: Path
+
+
+@dataclass(frozen=True)
+class RenderRecord:
+    index: int
+    post: Post
+    pdf_path: Path
+    status: str
+    failure_reason: str | None
+    page_count: int | None
+    rendered: bool
+    # Fingerprint of pdf_path when it was last validated; lets --resume trust
+    # unchanged chapters without parsing them again.
+    file_size: int | None = None
+    mtime_ns: int | None = None
+    sha256: str | None = None
+    # Wall time of the render (navigation to PDF), used for longest-first scheduling.
+    render_seconds: float | None = None
+    # Validators and .PostContent hash of the article as rendered; lets
+    # --check-changes find posts edited since then.
+    etag: str | None = None
+    last_modified: str | None = None
+    content_hash: str | None = None
+    # Peak RSS in bytes while rendering this post: the worker process and the
+    # largest of its browser processes (Linux only).
+    worker_peak_rss: int | None = None
+    browser_peak_rss: int | None = None
+    # Render profile (draft / standard / archival) the chapter was printed with;
+    # None in manifests written before profiles existed, which means standard.
+    profile: str | None = None
+    # Chapter bytes kept in memory by the in-memory pipeline so the merge stage
+    # does not have to read pdf_path again; never written to the manifest.
+    pdf_data: bytes | None = field(default=None, repr=False, compare=False)
+
+    @property
+    def pdf_source(self) -> Path | bytes:
+        return self.pdf_data if self.pdf_data is not None else self.pdf_path
+
+
+@dataclass(frozen=True)
+class RenderOutput:
+    pdf_paths: List[Path]
+    rendered_posts: List[Post]
+    records: List[RenderRecord]
+    manifest_path: Path | None
+
+    def __iter__(self):
+        yield self.pdf_paths
+        yield self.rendered_posts
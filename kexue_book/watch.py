@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, datetime, time as dtime, timezone
+from pathlib import Path
+from typing import Any, Callable, List
+import json
+import os
+import time
+
+import requests
+
+from .crawl import BASE_CATEGORY_URL, fetch_category_page, sort_posts
+from .manifest import save_post_list
+from .merge import merge_pdfs
+from .profiles import STANDARD_PROFILE, RenderProfile, profile_artifact
+from .render import RenderOptions, RenderSession, format_failure, render_posts_to_pdfs
+from .types import Post, RenderRecord
+
+WATCH_STATUS_NAME = "watch-status.json"
+RECENT_EVENTS = 20
+UNHEALTHY_AFTER_ERRORS = 3
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+@dataclass
+class _Latency:
+    count: int = 0
+    total: float = 0.0
+    last: float | None = None
+    max: float | None = None
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "last": None if self.last is None else round(self.last, 1),
+            "max": None if self.max is None else round(self.max, 1),
+            "mean": round(self.total / self.count, 1) if self.count else None,
+        }
+
+
+@dataclass
+class WatchStats:
+    """Health and latency counters written to ``watch-status.json`` after every poll."""
+
+    started_at: str = field(default_factory=_now_iso)
+    polls: int = 0
+    poll_errors: int = 0
+    consecutive_poll_errors: int = 0
+    build_errors: int = 0
+    consecutive_build_errors: int = 0
+    last_poll_at: str | None = None
+    last_error: str | None = None
+    posts_detected: int = 0
+    posts_rendered: int = 0
+    render_failures: int = 0
+    books_built: int = 0
+    last_book_at: str | None = None
+    browser_launches: int = 0
+    detect_to_pdf: _Latency = field(default_factory=_Latency)
+    publish_to_pdf: _Latency = field(default_factory=_Latency)
+    recent: List[dict[str, Any]] = field(default_factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "updated_at": _now_iso(),
+            "healthy": (
+                self.consecutive_poll_errors < UNHEALTHY_AFTER_ERRORS
+                and self.consecutive_build_errors < UNHEALTHY_AFTER_ERRORS
+            ),
+            "started_at": self.started_at,
+            "polls": self.polls,
+            "poll_errors": self.poll_errors,
+            "consecutive_poll_errors": self.consecutive_poll_errors,
+            "build_errors": self.build_errors,
+            "consecutive_build_errors": self.consecutive_build_errors,
+            "last_poll_at": self.last_poll_at,
+            "last_error": self.last_error,
+            "posts_detected": self.posts_detected,
+            "posts_rendered": self.posts_rendered,
+            "render_failures": self.render_failures,
+            "books_built": self.books_built,
+            "last_book_at": self.last_book_at,
+            "browser_launches": self.browser_launches,
+            "latency_seconds": {
+                "detect_to_pdf": self.detect_to_pdf.to_dict(),
+                # 站点只给出发布日期，这里按发布日当天 00:00（本地时间）计算
+                "publish_date_to_pdf": self.publish_to_pdf.to_dict(),
+            },
+            "recent": self.recent,
+        }
+
+
+def _write_status(path: Path, stats: WatchStats) -> None:
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(stats.to_dict(), f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def _publish_timestamp(publish_date: date) -> float:
+    return datetime.combine(publish_date, dtime.min).timestamp()
+
+
+def _rebuild(
+    posts: list[Post],
+    out_dir: Path,
+    book_path: Path,
+    session: RenderSession,
+    delay_ms: int,
+    merge_options: dict[str, Any],
+) -> list[RenderRecord]:
+    profile = session.profile.name
+    output = render_posts_to_pdfs(
+        posts,
+        out_dir / profile_artifact("chapters", profile),
+        RenderOptions(delay_ms=delay_ms, resume=True),
+        manifest_path=out_dir / profile_artifact("manifest.json", profile),
+        session=session,
+    )
+    if output.pdf_paths:
+        merge_pdfs(
+            output.pdf_paths,
+            output.rendered_posts,
+            book_path,
+            page_counts=[
+                record.page_count for record in output.records if record.status == "success"
+            ],
+            **merge_options,
+        )
+    return output.records
+
+
+def watch_posts(
+    posts: list[Post],
+    start: date,
+    end: date,
+    out_dir: Path,
+    book_path: Path,
+    interval_s: float,
+    delay_ms: int = 4000,
+    order: str = "asc",
+    category_url: str = BASE_CATEGORY_URL,
+    post_filter: Callable[[list[Post]], tuple[list[Post], list[Post]]] | None = None,
+    merge_options: dict[str, Any] | None = None,
+    max_polls: int | None = None,
+    asset_cache_dir: Path | None = None,
+    browser_server: Path | None = None,
+    profile: RenderProfile = STANDARD_PROFILE,
+) -> WatchStats:
+    """
+    Keep the book in ``book_path`` up to date with the category's first page.
+
+    The browser stays warm between polls, only new posts are rendered (existing
+    chapters are reused through the manifest), and the book is replaced atomically.
+    ``post_filter`` returns ``(kept, unchecked)``: posts it rejected are remembered
+    and not offered to it again, unchecked ones (e.g. the body fetch failed) are
+    offered again on the next poll.
+    """
+    merge_options = merge_options or {}
+    out_dir.mkdir(parents=True, exist_ok=True)
+    status_path = out_dir / WATCH_STATUS_NAME
+    stats = WatchStats()
+    posts = list(posts)
+    # url -> 首次发现时间；渲染成功前一直保留，用于重试与延迟统计
+    pending: dict[str, float] = {}
+    # 被过滤掉的 URL，之后的轮询不再当作新文章
+    rejected: set[str] = set()
+
+    with RenderSession(asset_cache_dir, browser_server=browser_server, profile=profile) as session:
+        print(f"[watch] 初始构建: {len(posts)} 篇 -> {book_path}")
+        if posts:
+            _rebuild(posts, out_dir, book_path, session, delay_ms, merge_options)
+            stats.books_built += 1
+            stats.last_book_at = _now_iso()
+        stats.browser_launches = session.launches
+        _write_status(status_path, stats)
+
+        while max_polls is None or stats.polls < max_polls:
+            time.sleep(interval_s)
+            stats.polls += 1
+            stats.last_poll_at = _now_iso()
+            detected_at = time.time()
+
+            try:
+                page_posts, _ = fetch_category_page(category_url)
+            except requests.RequestException as exc:
+                stats.poll_errors += 1
+                stats.consecutive_poll_errors += 1
+                stats.last_error = format_failure(exc)
+                print(f"[watch] warn 轮询失败: {exc}")
+                _write_status(status_path, stats)
+                continue
+            stats.consecutive_poll_errors = 0
+
+            known_urls = {post.url for post in posts} | rejected
+            new_posts = [
+                post
+                for post in page_posts
+                if post.url not in known_urls and post.date >= start
+            ]
+            if post_filter is not None and new_posts:
+                kept, unchecked = post_filter(new_posts)
+                decided_urls = {post.url for post in [*kept, *unchecked]}
+                rejected.update(post.url for post in new_posts if post.url not in decided_urls)
+                if unchecked:
+                    print(f"[watch] warn {len(unchecked)} 篇新文章暂时无法过滤，下次轮询重试")
+                new_posts = kept
+            if new_posts:
+                stats.posts_detected += len(new_posts)
+                print(f"[watch] 发现新文章 {len(new_posts)} 篇")
+                for post in new_posts:
+                    print(f"  + {post.date} {post.title} {post.url}")
+                    pending[post.url] = detected_at
+
+                posts.extend(new_posts)
+                sort_posts(posts)
+                if order == "desc":
+                    posts.reverse()
+                end = max([end, *(post.date for post in new_posts)])
+                save_post_list(out_dir / "posts.json", posts, start, end)
+
+            if not pending:
+                _write_status(status_path, stats)
+                continue
+
+            # 上一轮失败的新文章也会在这里重试，直到成功进入书中
+            try:
+                records = _rebuild(
+                    posts, out_dir, book_path, session, delay_ms, merge_options
+                )
+            except Exception as exc:
+                stats.build_errors += 1
+                stats.consecutive_build_errors += 1
+                stats.last_error = format_failure(exc)
+                print(f"[watch] warn 重建失败，下次轮询重试: {exc}")
+                _write_status(status_path, stats)
+                continue
+            finished_at = time.time()
+            stats.consecutive_build_errors = 0
+            stats.books_built += 1
+            stats.last_book_at = _now_iso()
+            stats.browser_launches = session.launches
+
+            for record in records:
+                first_seen = pending.get(record.post.url)
+                if first_seen is None:
+                    continue
+                event: dict[str, Any] = {
+                    "url": record.post.url,
+                    "title": record.post.title,
+                    "published": record.post.date.isoformat(),
+                    "status": record.status,
+                    "detected_at": datetime.fromtimestamp(first_seen, timezone.utc).isoformat(),
+                }
+                if record.status == "success":
+                    del pending[record.post.url]
+                    stats.posts_rendered += 1
+                    stats.detect_to_pdf.add(finished_at - first_seen)
+                    stats.publish_to_pdf.add(
+                        finished_at - _publish_timestamp(record.post.date)
+                    )
+                    event["pdf_at"] = datetime.fromtimestamp(finished_at, timezone.utc).isoformat()
+                else:
+                    stats.render_failures += 1
+                    event["failure_reason"] = record.failure_reason
+                stats.recent = [event, *stats.recent][:RECENT_EVENTS]
+
+            _write_status(status_path, stats)
+            print(f"[watch] 书籍已更新: {book_path}")
+
+    return stats
@@ -0,0 +1,40 @@
+from datetime import date
+from pathlib import Path
+
+from kexue_book.index import ContentIndex
+from kexue_book.types import Post
+
+
+def _index(tmp_path: Path, texts: dict[str, str]) -> ContentIndex:
+    index = ContentIndex(tmp_path / "content-index.sqlite")
+    for title, text in texts.items():
+        index.add(Post(title, f"https://example.invalid/{title}", date(2025, 1, 1)), text)
+    return index
+
+
+def test_single_cjk_character_matches_anywhere_in_a_run(tmp_path: Path) -> None:
+    with _index(
+        tmp_path,
+        {"end": "矩阵的特征值", "alone": "特征 向量 值", "start": "值得一看", "none": "矩阵"},
+    ) as index:
+        titles = {hit.url.rsplit("/", 1)[1] for hit in index.search(["值"])}
+    assert titles == {"end", "alone", "start"}
+
+
+def test_phrase_must_occur_in_text(tmp_path: Path) -> None:
+    with _index(tmp_path, {"phrase": "特征值", "split": "特征 征值"}) as index:
+        hits = index.search(["特征值"])
+    assert [hit.url.rsplit("/", 1)[1] for hit in hits] == ["phrase"]
+
+
+def test_non_ascii_words_are_indexed(tmp_path: Path) -> None:
+    with _index(tmp_path, {"greek": "the λ parameter", "latin": "Café Müller"}) as index:
+        assert [hit.url.rsplit("/", 1)[1] for hit in index.search(["λ"])] == ["greek"]
+        assert [hit.url.rsplit("/", 1)[1] for hit in index.search(["CAFÉ"])] == ["latin"]
+
+
+def test_keyword_without_terms_falls_back_to_substring_scan(tmp_path: Path) -> None:
+    with _index(tmp_path, {"arrow": "a -> b -> c", "plain": "a b c"}) as index:
+        hits = index.search(["->"])
+    assert [hit.url.rsplit("/", 1)[1] for hit in hits] == ["arrow"]
+    assert hits[0].score == 2.0
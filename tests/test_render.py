@@ -0,0 +1,81 @@
+from datetime import date
+from pathlib import Path
+
+import kexue_book.render as render
+from kexue_book.types import Post, RenderRecord, RenderTask
+
+
+class _FakeProbe:
+    def __init__(self, measure_browser: bool = True) -> None:
+        pass
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> tuple[int, int]:
+        return 100 * 1024 * 1024, 900 * 1024 * 1024
+
+
+class _FakePage:
+    def close(self) -> None:
+        pass
+
+
+class _FakeContext:
+    def new_page(self) -> _FakePage:
+        return _FakePage()
+
+
+def _task(tmp_path: Path) -> RenderTask:
+    post = Post("Heavy post", "https://example.invalid/heavy", date(2025, 1, 1))
+    return RenderTask(index=1, post=post, pdf_path=tmp_path / "001-heavy.pdf")
+
+
+def _render(task: RenderTask) -> RenderRecord:
+    return render.render_task(_FakeContext(), task, 0, 1, 1, prefix="[test]")
+
+
+def test_peaks_are_recorded_when_render_raises(tmp_path: Path, monkeypatch) -> None:
+    def crash(page, task, delay_ms, stream=True, profile=None):
+        raise RuntimeError("Target crashed")
+
+    monkeypatch.setattr(render, "PeakMemoryProbe", _FakeProbe)
+    monkeypatch.setattr(render, "_render_to_file", crash)
+
+    record = _render(_task(tmp_path))
+
+    assert record.status == "failed"
+    assert record.failure_reason == "Target crashed"
+    assert record.worker_peak_rss == 100 * 1024 * 1024
+    assert record.browser_peak_rss == 900 * 1024 * 1024
+
+
+def test_peaks_are_recorded_for_invalid_pdf(tmp_path: Path, monkeypatch) -> None:
+    def invalid(page, task, delay_ms, stream=True, profile=None):
+        return RenderRecord(
+            index=task.index,
+            post=task.post,
+            pdf_path=task.pdf_path,
+            status="failed",
+            failure_reason="Rendered PDF is missing, unreadable, or empty",
+            page_count=None,
+            rendered=True,
+        )
+
+    monkeypatch.setattr(render, "PeakMemoryProbe", _FakeProbe)
+    monkeypatch.setattr(render, "_render_to_file", invalid)
+
+    record = _render(_task(tmp_path))
+
+    assert record.status == "failed"
+    assert record.worker_peak_rss == 100 * 1024 * 1024
+    assert record.browser_peak_rss == 900 * 1024 * 1024
+
+
+def test_browser_peak_is_unknown_when_attached_to_browser_server() -> None:
+    from kexue_book.memory import PeakMemoryProbe
+
+    probe = PeakMemoryProbe(measure_browser=False)
+    probe.start()
+    _, browser_peak = probe.stop()
+    assert browser_peak is None
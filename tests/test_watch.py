@@ -0,0 +1,93 @@
+from datetime import date
+from pathlib import Path
+import json
+
+import kexue_book.watch as watch
+from kexue_book.profiles import STANDARD_PROFILE
+from kexue_book.types import Post, RenderRecord
+
+
+class _FakeSession:
+    launches = 1
+
+    def __init__(self, *args, **kwargs) -> None:
+        self.profile = STANDARD_PROFILE
+
+    def __enter__(self) -> "_FakeSession":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+def _fake_rebuild(posts, out_dir, book_path, session, delay_ms, merge_options):
+    return [
+        RenderRecord(
+            index=index,
+            post=post,
+            pdf_path=out_dir / "chapters" / f"{index:03d}.pdf",
+            status="success",
+            failure_reason=None,
+            page_count=1,
+            rendered=True,
+        )
+        for index, post in enumerate(posts, start=1)
+    ]
+
+
+def test_watch_creates_missing_output_dir(tmp_path: Path, monkeypatch) -> None:
+    post = Post("New post", "https://example.invalid/1", date(2025, 1, 2))
+    monkeypatch.setattr(watch, "RenderSession", _FakeSession)
+    monkeypatch.setattr(watch, "_rebuild", _fake_rebuild)
+    monkeypatch.setattr(watch, "fetch_category_page", lambda url: ([post], None))
+    monkeypatch.setattr(watch.time, "sleep", lambda seconds: None)
+
+    out_dir = tmp_path / "does" / "not" / "exist"
+    stats = watch.watch_posts(
+        [],
+        date(2025, 1, 1),
+        date(2025, 1, 1),
+        out_dir,
+        out_dir / "book.pdf",
+        interval_s=0,
+        max_polls=1,
+    )
+
+    assert stats.posts_detected == 1
+    assert stats.posts_rendered == 1
+    status = json.loads((out_dir / watch.WATCH_STATUS_NAME).read_text(encoding="utf-8"))
+    assert status["polls"] == 1
+
+
+def test_watch_retries_unchecked_posts_but_not_rejected_ones(
+    tmp_path: Path, monkeypatch
+) -> None:
+    kept = Post("Kept later", "https://example.invalid/kept", date(2025, 1, 2))
+    dropped = Post("Dropped", "https://example.invalid/dropped", date(2025, 1, 2))
+    monkeypatch.setattr(watch, "RenderSession", _FakeSession)
+    monkeypatch.setattr(watch, "_rebuild", _fake_rebuild)
+    monkeypatch.setattr(watch, "fetch_category_page", lambda url: ([kept, dropped], None))
+    monkeypatch.setattr(watch.time, "sleep", lambda seconds: None)
+
+    offered: list[list[str]] = []
+
+    def post_filter(posts: list[Post]) -> tuple[list[Post], list[Post]]:
+        offered.append([post.url for post in posts])
+        # 第一次轮询时 kept 的正文抓取失败，之后才能判断
+        if len(offered) == 1:
+            return [], [post for post in posts if post is kept]
+        return [post for post in posts if post is kept], []
+
+    stats = watch.watch_posts(
+        [],
+        date(2025, 1, 1),
+        date(2025, 1, 1),
+        tmp_path,
+        tmp_path / "book.pdf",
+        interval_s=0,
+        post_filter=post_filter,
+        max_polls=3,
+    )
+
+    assert offered == [[kept.url, dropped.url], [kept.url]]
+    assert stats.posts_rendered == 1